@@ -3,46 +3,276 @@ import os
 import json
 from scipy.io import wavfile
 from datetime import datetime
+from threading import Thread, Event
+from queue import Queue, Full
 import librosa
+import numpy as np
 import torch
 from transformers import Wav2Vec2ForSequenceClassification, Wav2Vec2FeatureExtractor, AutoModelForCausalLM, AutoTokenizer
+from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+try:
+    from transformers import DynamicCache
+except ImportError:  # Older transformers: prompt prefixes are recomputed for every chunk
+    DynamicCache = None
+import copy
+from model_registry import register_loader, get_model, inference_lock
+from fillers import analyze_fillers_batch, filler_word_indices
+import sys
+import time
+import logging
+from contextlib import contextmanager
+from observability import observe_span
+
+logger = logging.getLogger(__name__)
+
+# Settings shared with the server live in pipeline_config, which doesn't import the ML stack
+from pipeline_config import (PIPELINE_VERSION, EMOTION_MODEL_NAME, SUMMARY_MODEL_NAME, STREAMING_MIN_DURATION, VAD_ENABLED,
+                             INFERENCE_PRECISIONS, INFERENCE_PRECISION, SUMMARY_MAX_NEW_TOKENS, SUMMARY_DRAFT_MODEL_NAME,
+                             SUMMARY_CHUNK_TOKENS, SUMMARY_CHUNK_NEW_TOKENS, PIPELINE_STAGE_NAMES, default_model_specs)
 
 # Audio Processing Functions
 def load_audio(file_path):
     """Load the WAV file."""
     rate, data = wavfile.read(file_path)
     duration = len(data) / rate
-    print(f"Audio loaded: {file_path} | Sample Rate: {rate} | Duration: {len(data)/rate:.2f} sec")
+    logger.info("Audio loaded: %s | Sample Rate: %s | Duration: %.2f sec", file_path, rate, len(data) / rate)
+    return rate, data, duration
+
+def load_audio_16k(file_path, target_sr=16000):
+    """Decode the file once into a mono float32 array at 16 kHz, shared by every later stage."""
+    data, rate = read_normalized_pcm(file_path, target_sr)
+    if data is None:
+        data, rate = librosa.load(file_path, sr=target_sr, mono=True)
+    duration = len(data) / rate
+    logger.info("Audio loaded: %s | Sample Rate: %s | Duration: %.2f sec", file_path, rate, duration)
     return rate, data, duration
 
-def transcribe_audio(file_path, model_name="base", prompt=None):
-    """Transcribe audio using Whisper with optional custom prompts."""
-    model = whisper.load_model(model_name)
-    print(f"Transcribing audio using Whisper ({model_name} model)...")
-    result = model.transcribe(file_path, initial_prompt=prompt)
-    print("Transcription completed.")
+def read_normalized_pcm(file_path, target_sr=16000):
+    """Fast path for ingest's normalized 16 kHz mono 16-bit WAV: memory-map it instead of decoding."""
+    try:
+        rate, pcm = wavfile.read(file_path, mmap=True)
+    except ValueError:
+        return None, None  # Not a WAV file
+    if rate != target_sr or pcm.ndim != 1 or pcm.dtype != np.int16:
+        return None, None
+    return pcm.astype(np.float32) / 32768.0, rate
+
+@contextmanager
+def model_span(name):
+    """Time one model call into the span metrics."""
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        observe_span(name, time.perf_counter() - start, time.process_time() - cpu_start)
+
+def transcribe_audio(audio, model_name="base", prompt=None):
+    """Transcribe audio (a file path or a 16 kHz float32 array) using Whisper with optional custom prompts."""
+    model = get_model("whisper", model_name)
+    logger.info("Transcribing audio using Whisper (%s model)...", model_name)
+    # One transcription at a time per shared Whisper instance (see inference_lock)
+    with inference_lock("whisper", model_name), model_span("whisper_transcribe"):
+        result = model.transcribe(audio, initial_prompt=prompt, word_timestamps=True)
+    logger.info("Transcription completed.")
     return result
 
+def find_quiet_boundary(data, rate, start, end, frame_sec=0.02):
+    """Sample index of the quietest frame in data[start:end], so windows are cut between words."""
+    frame = max(1, int(frame_sec * rate))
+    frame_count = (end - start) // frame
+    if frame_count <= 0:
+        return end
+    frames = data[start:start + frame_count * frame].reshape(frame_count, frame)
+    energy = np.einsum("ij,ij->i", frames, frames)
+    return start + int(np.argmin(energy)) * frame + frame // 2
+
+def transcribe_audio_streaming(data, rate, model_name="base", prompt=None, window_sec=28.0, overlap_sec=1.0, search_sec=5.0):
+    """
+    Transcribe a long recording window by window, yielding segments as soon as each window is decoded.
+    Window ends are moved to the quietest point in the last `search_sec` seconds so words aren't split,
+    and each window starts `overlap_sec` early for context; segments from that overlap are not repeated.
+    Timestamps and ids are on the timeline of the whole recording.
+    """
+    model = get_model("whisper", model_name)
+    logger.info("Transcribing audio in %.0f sec windows using Whisper (%s model)...", window_sec, model_name)
+    total = len(data)
+    window = int(window_sec * rate)
+    overlap = int(overlap_sec * rate)
+    search = int(search_sec * rate)
+
+    start = 0
+    segment_id = 0
+    language = None
+    previous_text = ""
+    while start < total:
+        if start + window >= total:
+            end = total
+        else:
+            end = find_quiet_boundary(data, rate, start + window - search, start + window)
+        window_start = max(0, start - overlap)
+        offset = window_start / rate
+
+        # Carry the tail of the previous window as context, as Whisper does within a file
+        window_prompt = " ".join(part for part in (prompt, previous_text[-200:]) if part) or None
+        # Held per window, so concurrent streaming jobs take turns rather than queue whole files
+        with inference_lock("whisper", model_name), model_span("whisper_window"):
+            result = model.transcribe(data[window_start:end], initial_prompt=window_prompt, language=language, word_timestamps=True)
+        language = language or result.get("language")
+        previous_text = result["text"]
+
+        for segment in result["segments"]:
+            segment_start = segment["start"] + offset
+            segment_end = min(segment["end"] + offset, end / rate)
+            if segment_end <= start / rate:
+                continue  # Only heard in the overlap, already emitted by the previous window
+            all_words = segment.get("words", [])
+            words = [
+                dict(word, start=word["start"] + offset, end=word["end"] + offset)
+                for word in all_words
+                if start / rate <= word["start"] + offset < end / rate
+            ]
+            text = segment["text"]
+            if len(words) < len(all_words):
+                # Some words were in the overlap and already emitted; keep only the new ones
+                if not words:
+                    continue
+                text = "".join(word["word"] for word in words)
+            yield dict(
+                segment,
+                text=text,
+                id=segment_id,
+                seek=segment["seek"] + int(offset * 100),
+                start=max(segment_start, start / rate),
+                end=segment_end,
+                words=words,
+                language=language,
+            )
+            segment_id += 1
+        start = end
+    logger.info("Transcription completed.")
+
+def transcribe_and_analyze_streaming(data, rate, model_name, prompt, emotion_model, feature_extractor, progress=None, batch_size=8, loudness=None,
+                                     speech_data=None, speech_map=None):
+    """
+    Streaming transcription with per-segment analysis overlapped: Whisper runs in a producer
+    thread while this thread analyzes segments in emotion batches as they arrive.
+    With speech_data/speech_map (from condense_speech), Whisper only hears the speech and
+    segment timestamps are mapped back onto data's timeline before analysis.
+    Returns a transcription dict shaped like Whisper's, with every segment analyzed.
+    """
+    segment_queue = Queue(maxsize=4 * batch_size)
+    failure = []
+    # Set when analysis stops early, so the producer doesn't block on a full queue
+    stop = Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                segment_queue.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        # With a speech map, each segment is held until the next arrives, so one that
+        # collapses to zero length when mapped back can still be merged into a neighbour
+        held, orphans = None, []
+        try:
+            for segment in transcribe_audio_streaming(speech_data if speech_data is not None else data, rate, model_name=model_name, prompt=prompt):
+                if speech_map is not None:
+                    if not remap_segments([segment], speech_map):
+                        if held is not None:
+                            merge_segment(held, segment)
+                        else:
+                            orphans.append(segment)
+                        continue
+                    for orphan in orphans:
+                        merge_segment(segment, orphan)
+                    orphans.clear()
+                if held is not None and not put(held):
+                    return  # Leaving the loop closes the generator, which stops Whisper
+                held = segment
+            if held is not None:
+                put(held)
+        except Exception as e:
+            failure.append(e)
+        finally:
+            put(None)
+
+    Thread(target=produce, daemon=True).start()
+
+    segments = []
+    pending = []
+
+    def analyze_pending():
+        pending_audio = segment_views(data, rate, pending)
+        emotion_results = analyze_emotions_batched(pending_audio, emotion_model, feature_extractor, batch_size=batch_size, sampling_rate=rate)
+        filler_results = analyze_fillers_batch([segment["text"] for segment in pending])
+        volumes = segment_volumes(loudness, pending) if loudness else [None] * len(pending)
+        for segment, segment_data, emotion_analysis, filler_analysis, volume in zip(pending, pending_audio, emotion_results, filler_results, volumes):
+            analyze_segment(segment, segment_data, emotion_analysis, filler_analysis, volume)
+            segments.append(segment)
+            report_progress(progress, "segment", segment=segment_event_payload(segment))
+        report_progress(progress, "emotion", done=len(segments), total=None)
+        pending.clear()
+
+    try:
+        while True:
+            segment = segment_queue.get()
+            if segment is None:
+                break
+            pending.append(segment)
+            if len(pending) >= batch_size:
+                analyze_pending()
+    finally:
+        stop.set()
+    if failure:
+        raise failure[0]
+    if pending:
+        analyze_pending()
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": segments[0]["language"] if segments else None,
+    }
+
+def segment_views(data, rate, segments):
+    """Slice the decoded recording into per-segment views (no copies) using transcription timestamps."""
+    views = []
+    for segment in segments:
+        start_sample = int(segment["start"] * rate)
+        end_sample = int(segment["end"] * rate)
+        views.append(data[start_sample:end_sample])
+    return views
+
+def export_segments(data, rate, segments, output_dir, background=True):
+    """Optionally write the segments to WAV files, in a background thread by default."""
+    if background:
+        thread = Thread(target=segment_audio_by_timestamps, args=(data, rate, segments, output_dir), daemon=True)
+        thread.start()
+        return thread
+    segment_audio_by_timestamps(data, rate, segments, output_dir)
+    return None
+
 def segment_audio_by_timestamps(data, rate, segments, output_dir):
     """Segment audio using transcription timestamps."""
     os.makedirs(output_dir, exist_ok=True)
     segment_files = []
-    for segment in segments:
+    for segment, segment_data in zip(segments, segment_views(data, rate, segments)):
         segment_id = segment["id"]
-        start_sample = int(segment["start"] * rate)
-        end_sample = int(segment["end"] * rate)
-        segment_data = data[start_sample:end_sample]
         output_path = os.path.join(output_dir, f"segment_{segment_id}.wav")
         wavfile.write(output_path, rate, segment_data.astype(data.dtype))
         segment_files.append(output_path)
-        print(f"Saved: {output_path}")
+        logger.debug("Saved: %s", output_path)
     return segment_files
 
 def save_transcription_to_json(transcription, output_file):
     """Save transcription result to a JSON file."""
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(transcription, f, ensure_ascii=False, indent=4)
-    print(f"Transcription saved to {output_file}")
+    logger.info("Transcription saved to %s", output_file)
 
 def generate_unique_output_dir(base_dir, input_file):
     """Generate a unique output directory name."""
@@ -58,10 +288,43 @@ def preprocess_audio(file_path, target_sr=16000):
     return torch.tensor(y).unsqueeze(0)  # Add batch dimension
 
 # Load the model and processor
-def load_emotion_model():
+def bf16_supported():
+    """Whether bf16 matmuls run natively here (CUDA, or a CPU with AVX512-BF16/AMX)."""
+    if torch.cuda.is_available():
+        return torch.cuda.is_bf16_supported()
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except (AttributeError, RuntimeError):
+        return False
+
+def resolve_precision(precision=None):
+    """The precision to load models in, falling back to fp32 where the requested one can't run."""
+    precision = precision or INFERENCE_PRECISION
+    if precision not in INFERENCE_PRECISIONS:
+        raise ValueError(f"Unknown inference precision '{precision}', expected one of {INFERENCE_PRECISIONS}")
+    if precision == "bf16" and not bf16_supported():
+        logger.warning("bf16 is not supported on this machine, using fp32")
+        return "fp32"
+    return precision
+
+def apply_inference_precision(model, precision):
+    """Quantize or cast a loaded model for inference at the given (resolved) precision."""
+    model.eval()
+    if precision == "int8":
+        device = next(model.parameters()).device
+        if device.type != "cpu":
+            logger.warning("int8 dynamic quantization is CPU-only, keeping fp32 on %s", device)
+            return model
+        # Weights of every Linear layer become int8; activations are quantized on the fly
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if precision == "bf16":
+        return model.to(torch.bfloat16)
+    return model
+
+def load_emotion_model(model_name=EMOTION_MODEL_NAME, precision=None):
     """Load the Hugging Face Wav2Vec2 model for emotion recognition."""
-    model_name = "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition"
     model = Wav2Vec2ForSequenceClassification.from_pretrained(model_name)
+    model = apply_inference_precision(model, resolve_precision(precision))
     feature_extractor = Wav2Vec2FeatureExtractor.from_pretrained(model_name)
     return model, feature_extractor
 
@@ -77,24 +340,65 @@ def analyze_emotion_with_huggingface(file_path, model, feature_extractor):
 
     # Get probabilities and predicted emotion
     probabilities = torch.nn.functional.softmax(logits, dim=-1)[0]
-    
+    return emotion_result(probabilities)
+
+# Emotion labels (specific to this model)
+EMOTION_LABELS = ['angry', 'calm', 'disgust', 'fearful', 'happy', 'neutral', 'sad', 'surprised']
+
+def emotion_result(probabilities):
+    """Build the emotion_analysis dict from one segment's class probabilities."""
     predicted_label = torch.argmax(probabilities).item()
 
-    # Emotion labels (specific to this model)
-    emotions = ['angry', 'calm', 'disgust', 'fearful', 'happy', 'neutral', 'sad', 'surprised']
     # Convert probabilities to a list
-    confidence_scores = probabilities.tolist()    
-    
-    predicted_emotion = emotions[predicted_label]
-
+    confidence_scores = probabilities.tolist()
+    predicted_emotion = EMOTION_LABELS[predicted_label]
 
-    print(f"Predicted Emotion: {predicted_emotion}")
-    print(f"Confidence Scores: {confidence_scores}")
+    logger.debug("Predicted Emotion: %s | Confidence Scores: %s", predicted_emotion, confidence_scores)
 
     return {
         "predicted_emotion": predicted_emotion,
         "confidence_scores": confidence_scores
     }
+
+def analyze_emotions_batched(segment_audio, model, feature_extractor, batch_size=8, sampling_rate=16000, on_batch=None):
+    """
+    Analyze emotions for all segments of a recording in padded batches.
+    Args:
+        segment_audio (list): 1-D float arrays, one per segment, at `sampling_rate`.
+        batch_size (int): Maximum number of segments per forward pass.
+        on_batch (callable): Called with (segments_done, total_segments) after each batch.
+    Returns:
+        list: One emotion_analysis dict per segment, in the input order.
+    """
+    results = [None] * len(segment_audio)
+
+    # Group segments of similar length so batches carry little padding
+    order = sorted(range(len(segment_audio)), key=lambda i: len(segment_audio[i]))
+
+    for batch_start in range(0, len(order), batch_size):
+        batch_ids = order[batch_start:batch_start + batch_size]
+        inputs = feature_extractor(
+            [segment_audio[i] for i in batch_ids],
+            sampling_rate=sampling_rate,
+            return_tensors="pt",
+            padding=True,
+            return_attention_mask=True,
+        )
+        # The feature extractor always returns fp32; a bf16 model needs bf16 inputs
+        if inputs["input_values"].dtype != model.dtype:
+            inputs["input_values"] = inputs["input_values"].to(model.dtype)
+
+        with torch.no_grad(), model_span("emotion_batch"):
+            logits = model(**inputs).logits
+        probabilities = torch.nn.functional.softmax(logits.float(), dim=-1)
+
+        for row, segment_index in enumerate(batch_ids):
+            results[segment_index] = emotion_result(probabilities[row])
+
+        if on_batch:
+            on_batch(batch_start + len(batch_ids), len(order))
+
+    return results
     
 def aggregate_feedback(transcription):
     """Aggregate feedback from all segments into a structured format."""
@@ -122,56 +426,239 @@ def aggregate_feedback(transcription):
     return feedback_summary
 
     
-def load_local_model(model_name="Qwen/Qwen2.5-0.5B-Instruct"):
+def inference_device():
+    """The device to run the LLM on: the GPU when there is one, otherwise the CPU."""
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return torch.device("mps")
+    return torch.device("cpu")
+
+def load_local_model(model_name="Qwen/Qwen2.5-0.5B-Instruct", precision=None):
     """Load a local instruction-tuned model."""
+    precision = resolve_precision(precision)
     tokenizer = AutoTokenizer.from_pretrained(model_name)
-    model = AutoModelForCausalLM.from_pretrained(model_name, device_map="auto")  # Leverage GPU if available
+    # bf16 weights are loaded directly instead of materializing fp32 first
+    torch_dtype = torch.bfloat16 if precision == "bf16" else None
+    model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch_dtype)
+    # Dynamically quantized layers only run on the CPU
+    if precision != "int8":
+        model = model.to(inference_device())
+    model = apply_inference_precision(model, precision)
     return model, tokenizer
 
-def generate_summary_with_local_model(transcription_text, feedback_summary, model, tokenizer):
+# Loaders used by the model registry, so each model is loaded once per process
+register_loader("whisper", whisper.load_model)
+register_loader("emotion", load_emotion_model)
+register_loader("llm", load_local_model)
+
+SUMMARY_INSTRUCTIONS = (
+    "You are an extremely concise expert speech coach. Give feedback on the presentation transcript "
+    "directly to the speaker. Focus on filler word (e.g. um, like, uh) usage and improvements, emotional "
+    "tone and audience engagement, and clarity, coherence and delivery. Answer in a single paragraph of "
+    "at most 3 sentences with actionable feedback to improve delivery."
+)
+# Map step of long transcripts: notes on one part of the talk, reduced into the final feedback
+CHUNK_SUMMARY_INSTRUCTIONS = (
+    "You are an expert speech coach taking notes on one part of a longer presentation. In at most "
+    "3 sentences, summarize what this part covers and any delivery problems (filler words, rambling, "
+    "unclear wording) it shows."
+)
+REDUCE_SUMMARY_INSTRUCTIONS = (
+    "You are an extremely concise expert speech coach. Below are delivery metrics measured over a whole "
+    "presentation and notes on each part of it. Give feedback directly to the speaker on filler word usage, "
+    "emotional tone and audience engagement, and clarity, coherence and delivery. Answer in a single "
+    "paragraph of at most 3 sentences with actionable feedback to improve delivery."
+)
+
+class ParagraphBreakCriteria(StoppingCriteria):
+    """Stops generation once the new text contains a paragraph break after some content."""
+
+    def __init__(self, tokenizer, prompt_length):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = [
+            "\n\n" in self.tokenizer.decode(row[self.prompt_length:], skip_special_tokens=True).strip()
+            for row in input_ids
+        ]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+def chat_prompt_parts(instructions, content, tokenizer):
     """
-    Generate a concise summary of the transcription text using a local LLM,
-    incorporating filler and emotion analysis.
+    The rendered prompt split into (prefix, rest), through the model's chat template when it
+    has one. The prefix depends only on the instructions, so its KV cache can be shared.
     """
-    prompt = f"""
-    You are a extremely concise expert speech coach. Provide feedback on the following presentation transcript directly to me. Focus on:
+    if getattr(tokenizer, "chat_template", None):
+        messages = [
+            {"role": "system", "content": instructions},
+            {"role": "user", "content": content},
+        ]
+        text = tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+    else:
+        text = f"{instructions}\n\n{content}\n\n### Analysis:\n"
+    split = text.index(content)
+    return text[:split], text[split:]
 
-    - Filler word (e.g. um, like, uh, etc) usage and improvements
-    - Emotional tone and audience engagement.
-    - Clarity, coherence, and delivery.
+class PromptPrefixCache:
+    """KV cache of a prompt prefix shared by many generations: computed once, copied per use."""
 
-    Transcript:
-    {transcription_text}
+    def __init__(self, model, tokenizer, prefix):
+        self.ids = tokenizer(prefix, add_special_tokens=False)["input_ids"]
+        self.cache = None
+        if DynamicCache is not None:
+            input_ids = torch.tensor([self.ids], device=next(model.parameters()).device)
+            with torch.no_grad():
+                self.cache = model(input_ids, past_key_values=DynamicCache(), use_cache=True).past_key_values
 
-    Your response must be as concise as possible and under 3 sentences and provide actionable feedback to help me improve delivery. 
+    def copy(self):
+        # generate() extends the cache in place, so every use gets its own copy
+        return copy.deepcopy(self.cache) if self.cache is not None else None
 
-    ### Analysis:
-    """
+def prompt_ids(prefix_ids, rest, tokenizer, device):
+    """Token ids of prefix + rest; the prefix is tokenized separately so it matches its cache."""
+    ids = list(prefix_ids) + tokenizer(rest, add_special_tokens=False)["input_ids"]
+    return torch.tensor([ids], device=device)
 
-    # Tokenize and generate output
-    inputs = tokenizer(prompt, return_tensors="pt", padding=True, truncation=True).to("cuda")
-    outputs = model.generate(
-        inputs["input_ids"],
+def generate_text(model, tokenizer, input_ids, max_new_tokens, draft_model=None, on_text=None, past_key_values=None):
+    """
+    Greedy (speculative with draft_model) generation of at most max_new_tokens new tokens,
+    stopped at the first paragraph break. on_text, if given, is called with each piece of
+    text as it is generated. Returns the first paragraph of the new text.
+    """
+    prompt_length = input_ids.shape[1]
+    generate_kwargs = dict(
+        input_ids=input_ids,
+        attention_mask=torch.ones_like(input_ids),
+        max_new_tokens=max_new_tokens,
+        do_sample=False,
         no_repeat_ngram_size=3,
-        max_length=1024,
-        num_beams=3,
+        stopping_criteria=StoppingCriteriaList([ParagraphBreakCriteria(tokenizer, prompt_length)]),
+        pad_token_id=tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id,
     )
+    if draft_model is not None:
+        generate_kwargs["assistant_model"] = draft_model
+    elif past_key_values is not None:
+        generate_kwargs["past_key_values"] = past_key_values
 
-    # Decode and clean the output
-    summary = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    print('pre-cutoff summary: ', summary)
+    start, cpu_start = time.perf_counter(), time.process_time()
+    if on_text:
+        # Generate in a thread and relay text as the streamer decodes it
+        streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        result = {}
+        def _generate():
+            try:
+                with torch.no_grad():
+                    result["outputs"] = model.generate(**generate_kwargs, streamer=streamer)
+            except Exception as e:
+                result["error"] = e
+                streamer.end()
+        generator = Thread(target=_generate, daemon=True)
+        generator.start()
+        for text in streamer:
+            if text:
+                on_text(text)
+        generator.join()
+        if "error" in result:
+            raise result["error"]
+        outputs = result["outputs"]
+    else:
+        with torch.no_grad():
+            outputs = model.generate(**generate_kwargs)
+    observe_span("llm_generate", time.perf_counter() - start, time.process_time() - cpu_start)
+
+    # Only the new tokens are decoded; the prompt never needs to be split off
+    text = tokenizer.decode(outputs[0, prompt_length:], skip_special_tokens=True)
+    return text.strip().split("\n\n")[0].strip()
+
+def feedback_metrics_text(feedback_summary, transcription=None):
+    """The aggregated filler/emotion/pacing metrics as short lines for the summary prompt."""
+    segments = feedback_summary["segment_feedback"]
+    total_words = sum(len(segment["text"].split()) for segment in segments)
+    lines = [f"Filler words: {feedback_summary['overall_fillers']} in {total_words} words"]
+    emotions = sorted(feedback_summary["overall_emotions_summary"].items(), key=lambda item: -item[1])
+    if emotions:
+        lines.append("Emotions by segment: " + ", ".join(f"{emotion} {count}" for emotion, count in emotions))
+    if transcription is not None:
+        if transcription.get("average_pacing"):
+            lines.append(f"Average pace: {transcription['average_pacing'] * 60:.0f} words per minute")
+        word_metrics = transcription.get("word_metrics") or {}
+        if word_metrics.get("count"):
+            lines.append(f"Pauses over {word_metrics['long_pause_sec']:g} sec: {word_metrics['long_pauses']}")
+        silence = transcription.get("silence")
+        if silence and silence["pause_count"]:
+            lines.append(f"Silence: {silence['silence_ratio'] * 100:.0f}% of the recording, longest pause {silence['longest_pause_sec']:.1f} sec")
+    return "\n".join(lines)
 
-    # Remove any prompt-like content from the output
-    if "### Analysis:" in summary:
-        summary = summary.split("### Analysis:")[-1].strip()
-        
-    summary = summary.split("\n\n")[0].strip()  # Only keep the first paragraph
+def chunk_segments(segments, tokenizer, max_tokens):
+    """Group consecutive segments into chunks of at most max_tokens transcript tokens."""
+    if not segments:
+        return []
+    lengths = [len(ids) for ids in tokenizer([segment["text"] for segment in segments], add_special_tokens=False)["input_ids"]]
+    chunks, current, current_tokens = [], [], 0
+    for segment, length in zip(segments, lengths):
+        if current and current_tokens + length > max_tokens:
+            chunks.append(current)
+            current, current_tokens = [], 0
+        current.append(segment)
+        current_tokens += length
+    chunks.append(current)
+    return chunks
 
-    return summary
+def summarize_chunks(chunks, model, tokenizer, max_new_tokens=None, on_chunk=None):
+    """
+    Map step: notes on each chunk of segments. Chunks share the instruction prefix, whose KV
+    cache is computed once and reused instead of being re-encoded for every chunk.
+    """
+    device = next(model.parameters()).device
+    prefix_cache = None
+    notes = []
+    for index, chunk in enumerate(chunks):
+        content = "Transcript part:\n" + " ".join(segment["text"].strip() for segment in chunk)
+        prefix, rest = chat_prompt_parts(CHUNK_SUMMARY_INSTRUCTIONS, content, tokenizer)
+        if prefix_cache is None:
+            prefix_cache = PromptPrefixCache(model, tokenizer, prefix)
+        input_ids = prompt_ids(prefix_cache.ids, rest, tokenizer, device)
+        notes.append({
+            "start": chunk[0]["start"],
+            "end": chunk[-1]["end"],
+            "summary": generate_text(model, tokenizer, input_ids, max_new_tokens or SUMMARY_CHUNK_NEW_TOKENS,
+                                     past_key_values=prefix_cache.copy()),
+        })
+        if on_chunk:
+            on_chunk(index + 1, len(chunks))
+    return notes
+
+def generate_summary_with_local_model(transcription_text, feedback_summary, model, tokenizer,
+                                      max_new_tokens=None, draft_model=None, on_text=None,
+                                      transcription=None, on_chunk=None):
+    """
+    Generate a concise summary of the transcription text using a local LLM,
+    incorporating filler and emotion analysis.
+    Transcripts over SUMMARY_CHUNK_TOKENS tokens are summarized in chunks of segments
+    (transcription is needed for those), then reduced with the aggregated metrics.
+    """
+    device = next(model.parameters()).device
+    max_new_tokens = max_new_tokens or SUMMARY_MAX_NEW_TOKENS
+    metrics = feedback_metrics_text(feedback_summary, transcription)
+
+    transcript_tokens = len(tokenizer(transcription_text, add_special_tokens=False)["input_ids"])
+    if transcript_tokens <= SUMMARY_CHUNK_TOKENS or transcription is None:
+        content = f"Delivery metrics:\n{metrics}\n\nTranscript:\n{transcription_text}"
+        prefix, rest = chat_prompt_parts(SUMMARY_INSTRUCTIONS, content, tokenizer)
+    else:
+        chunks = chunk_segments(transcription["segments"], tokenizer, SUMMARY_CHUNK_TOKENS)
+        logger.info("Transcript is %d tokens, summarizing %d chunks first", transcript_tokens, len(chunks))
+        notes = summarize_chunks(chunks, model, tokenizer, on_chunk=on_chunk)
+        content = f"Delivery metrics:\n{metrics}\n\nNotes by part:\n" + "\n".join(
+            f"[{note['start'] / 60:.0f}-{note['end'] / 60:.0f} min] {note['summary']}" for note in notes)
+        prefix, rest = chat_prompt_parts(REDUCE_SUMMARY_INSTRUCTIONS, content, tokenizer)
+
+    input_ids = prompt_ids(tokenizer(prefix, add_special_tokens=False)["input_ids"], rest, tokenizer, device)
+    return generate_text(model, tokenizer, input_ids, max_new_tokens, draft_model=draft_model, on_text=on_text)
 
 
-import re
 def analyze_filler_words(transcript, filler_words=None):
     """
     Analyze the transcript to detect and count filler words.
@@ -179,93 +666,222 @@ def analyze_filler_words(transcript, filler_words=None):
         transcript (str): The transcribed text from the audio segment.
         filler_words (list): List of filler words to detect.
     Returns:
-        dict: A dictionary with filler word counts and their percentage.
+        dict: Filler word counts, their percentage and character positions.
     """
-    if filler_words is None:
-        filler_words = ["uh", "um", "ah", "like", "you know", "well", "hmm"]
+    return analyze_fillers_batch([transcript], filler_words)[0]
+    
+def report_progress(progress, stage, **fields):
+    """Send a progress event to the pipeline's listener, if there is one."""
+    if progress:
+        progress({"stage": stage, **fields})
+
+def segment_event_payload(segment):
+    """An analyzed segment as sent in progress events, without Whisper's token ids."""
+    return {key: value for key, value in segment.items() if key != "tokens"}
+
+def analyze_segment(segment, segment_data, emotion_analysis, filler_analysis=None, volume=None):
+    """Attach emotion, filler, pacing and volume analysis to one transcribed segment."""
+    logger.debug("Analyzing Segment %s...", segment["id"])
+
+    # Emotion and filler analysis
+    segment["emotion_analysis"] = emotion_analysis
+    segment["filler_analysis"] = filler_analysis or analyze_filler_words(segment["text"])
 
-    # Normalize text
-    transcript = transcript.lower()
-    words = re.findall(r'\b\w+\b', transcript)  # Tokenize words
-    total_words = len(words)
+    # Pacing analysis
+    segment_duration = segment["end"] - segment["start"]
+    segment["pacing"] = calculate_pacing(segment["text"], segment_duration)
 
-    # Count filler words
-    filler_counts = {word: transcript.count(word) for word in filler_words}
-    total_fillers = sum(filler_counts.values())
+    # Volume analysis, looked up from the loudness envelope when the caller has one
+    segment["volume"] = volume if volume is not None else calculate_volume(segment_data)
+    return segment
 
-    # Calculate percentage
-    filler_percentage = (total_fillers / total_words) * 100 if total_words > 0 else 0
+@contextmanager
+def timed_span(job, name):
+    """Record wall and CPU time of a block as a named span in job["timings"] and in the metrics."""
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        span = {
+            "name": name,
+            "start": start,
+            "end": end,
+            "wall_sec": end - start,
+            # Process-wide, so it includes torch's intra-op threads (and overlapping jobs, if any)
+            "cpu_sec": time.process_time() - cpu_start,
+        }
+        job["timings"].append(span)
+        observe_span(name, span["wall_sec"], span["cpu_sec"])
 
+def new_pipeline_job(input_file, base_output_dir, model_name="base", prompt=None, export_segment_files=False, progress=None, streaming=None):
+    """State carried by one recording through the pipeline stages."""
     return {
-        "filler_counts": filler_counts,
-        "total_fillers": total_fillers,
-        "filler_percentage": filler_percentage,
+        "input_file": input_file,
+        "base_output_dir": base_output_dir,
+        "model_name": model_name,
+        "prompt": prompt,
+        "export_segment_files": export_segment_files,
+        "progress": progress,
+        "streaming": streaming,
+        "timings": [],
     }
-    
-def preprocess_audio_pipeline(input_file, base_output_dir, model_name="base", prompt=None):
-    """Complete transcription and text analysis pipeline."""
-    output_dir = generate_unique_output_dir(base_output_dir, input_file)
-    rate, data, duration = load_audio(input_file)
-    upload_time = datetime.now().isoformat()
-
-    # Transcribe the audio
-    transcription = transcribe_audio(input_file, model_name=model_name, prompt=prompt)
-
-    # Segment audio and analyze emotions/fillers
-    segment_files = segment_audio_by_timestamps(data, rate, transcription["segments"], output_dir)
-    emotion_model, feature_extractor = load_emotion_model()
-
-    overall_pacing = []
-    overall_volume = []
-
-    for segment_file, segment in zip(segment_files, transcription["segments"]):
-        print(f"Analyzing Segment {segment['id']}...")
-
-        # Emotion and filler analysis
-        segment["emotion_analysis"] = analyze_emotion_with_huggingface(segment_file, emotion_model, feature_extractor)
-        segment["filler_analysis"] = analyze_filler_words(segment["text"])
-
-        # Pacing analysis
-        segment_duration = segment["end"] - segment["start"]
-        segment_pacing = calculate_pacing(segment["text"], segment_duration)
-        segment["pacing"] = segment_pacing
-        overall_pacing.append(segment_pacing)
-
-        # Volume analysis
-        rate, segment_data = wavfile.read(segment_file)
-        segment_volume = calculate_volume(segment_data)
-        segment["volume"] = segment_volume
-        overall_volume.append(segment_volume)
-
-    # Aggregate feedback for metrics
-    feedback_summary = aggregate_feedback(transcription)
-    
-    # Add overall metrics for pacing and volume
-    transcription["average_pacing"] = np.mean(overall_pacing) if overall_pacing else 0
-    transcription["average_volume"] = np.mean(overall_volume) if overall_volume else 0
-
-    # Load the local LLM for full-text analysis
-    print("\nLoading local instruction-tuned LLM...")
-    local_model, local_tokenizer = load_local_model(model_name="HuggingFaceTB/SmolLM2-360M-Instruct")
-
-    # Generate summary using aggregated feedback and transcription text
-    print("\nGenerating summarized presentation feedback...")
-    summarized_feedback = generate_summary_with_local_model(transcription["text"], feedback_summary, local_model, local_tokenizer)
-    print("\nSummarized Feedback:", summarized_feedback)
+
+def transcribe_stage(job):
+    """Stage 1: decode the audio and transcribe it (analyzing segments too when streaming)."""
+    progress = job["progress"]
+    job["output_dir"] = generate_unique_output_dir(job["base_output_dir"], job["input_file"])
+    # Decode and resample once; every stage below works on this array
+    with timed_span(job, "load"):
+        rate, data, duration = load_audio_16k(job["input_file"])
+    job.update(rate=rate, data=data, duration=duration, upload_time=datetime.now().isoformat())
+    # Loudness of the whole recording, computed once; segment and word volumes are lookups into it
+    with timed_span(job, "pacing_volume"):
+        job["loudness"] = compute_loudness(data, rate)
+
+    # Speech regions from the same loudness frames; the heavy models only get the speech
+    speech_data, speech_map = None, None
+    with timed_span(job, "vad"):
+        regions = detect_speech_regions(job["loudness"], duration)
+        job["silence"] = silence_stats(regions, duration)
+        if VAD_ENABLED and regions and job["silence"]["silence_sec"] >= 1.0:
+            speech_data, speech_map = condense_speech(data, rate, regions)
+            logger.info("VAD kept %.1f of %.1f sec as speech", len(speech_data) / rate, duration)
+
+    streaming = job["streaming"]
+    if streaming is None:
+        streaming = duration >= STREAMING_MIN_DURATION
+
+    if streaming:
+        # Transcribe window by window, analyzing segments as they are decoded
+        emotion_model, feature_extractor = get_model("emotion", EMOTION_MODEL_NAME)
+        report_progress(progress, "transcribing", duration=duration, streaming=True)
+        # Segmenting and emotion/filler analysis overlap Whisper here, so they share its span
+        with timed_span(job, "transcribe"):
+            job["transcription"] = transcribe_and_analyze_streaming(data, rate, job["model_name"], job["prompt"], emotion_model, feature_extractor, progress, loudness=job["loudness"],
+                                                                    speech_data=speech_data, speech_map=speech_map)
+        job["segments_analyzed"] = True
+    else:
+        # Transcribe the audio
+        report_progress(progress, "transcribing", duration=duration)
+        with timed_span(job, "transcribe"):
+            job["transcription"] = transcribe_audio(speech_data if speech_data is not None else data, model_name=job["model_name"], prompt=job["prompt"])
+        if speech_map is not None:
+            job["transcription"]["segments"] = remap_segments(job["transcription"]["segments"], speech_map)
+        job["segments_analyzed"] = False
+    return job
+
+def analyze_stage(job):
+    """Stage 2: per-segment emotion, filler, pacing and volume analysis, then aggregate metrics."""
+    progress = job["progress"]
+    transcription = job["transcription"]
+    rate, data = job["rate"], job["data"]
+
+    if not job["segments_analyzed"]:
+        # Segment audio in memory and analyze emotions/fillers
+        report_progress(progress, "segmenting", segments=len(transcription["segments"]))
+        with timed_span(job, "segment"):
+            segment_audio = segment_views(data, rate, transcription["segments"])
+        emotion_model, feature_extractor = get_model("emotion", EMOTION_MODEL_NAME)
+
+        # Emotion analysis for all segments at once, in padded batches
+        with timed_span(job, "emotion"):
+            emotion_results = analyze_emotions_batched(
+                segment_audio, emotion_model, feature_extractor, sampling_rate=rate,
+                on_batch=lambda done, total: report_progress(progress, "emotion", done=done, total=total),
+            )
+
+        # Filler words and volumes for every segment in one pass
+        with timed_span(job, "filler"):
+            filler_results = analyze_fillers_batch([segment["text"] for segment in transcription["segments"]])
+
+        with timed_span(job, "pacing_volume"):
+            volumes = segment_volumes(job["loudness"], transcription["segments"])
+            for segment_data, segment, emotion_analysis, filler_analysis, volume in zip(segment_audio, transcription["segments"], emotion_results, filler_results, volumes):
+                analyze_segment(segment, segment_data, emotion_analysis, filler_analysis, volume)
+                report_progress(progress, "segment", segment=segment_event_payload(segment))
+        job["segments_analyzed"] = True
+
+    if job["export_segment_files"]:
+        export_segments(data, rate, transcription["segments"], job["output_dir"])
+
+    with timed_span(job, "pacing_volume"):
+        overall_pacing = [segment["pacing"] for segment in transcription["segments"]]
+        overall_volume = [segment["volume"] for segment in transcription["segments"]]
+
+        # Aggregate feedback for metrics
+        job["feedback_summary"] = aggregate_feedback(transcription)
+
+        # Per-word pacing, pauses, fillers, local rate and volume from the word timestamps
+        transcription["word_metrics"] = compute_word_metrics(transcription["segments"], loudness=job["loudness"])
+
+        # Downsampled loudness for the frontend's waveform display
+        transcription["loudness_envelope"] = loudness_envelope(job["loudness"])
+
+        # Silence and pauses between speech regions, from the VAD pass
+        transcription["silence"] = job["silence"]
+
+        # Add overall metrics for pacing and volume
+        transcription["average_pacing"] = np.mean(overall_pacing) if overall_pacing else 0
+        transcription["average_volume"] = np.mean(overall_volume) if overall_volume else 0
+    return job
+
+def summarize_stage(job):
+    """Stage 3: LLM feedback summary, then write analysis_results.json."""
+    transcription = job["transcription"]
+
+    # Load the local LLM for full-text analysis, and its draft model for speculative decoding
+    local_model, local_tokenizer = get_model("llm", SUMMARY_MODEL_NAME)
+    draft_model = get_model("llm", SUMMARY_DRAFT_MODEL_NAME)[0] if SUMMARY_DRAFT_MODEL_NAME else None
+
+    # Generate summary using aggregated feedback and transcription text, streaming it to listeners
+    logger.info("Generating summarized presentation feedback...")
+    report_progress(job["progress"], "summarizing")
+    on_text = (lambda text: report_progress(job["progress"], "summary_text", text=text)) if job["progress"] else None
+    on_chunk = (lambda done, total: report_progress(job["progress"], "summarizing", chunks_done=done, chunks_total=total)) if job["progress"] else None
+    with timed_span(job, "summarize"):
+        summarized_feedback = generate_summary_with_local_model(transcription["text"], job["feedback_summary"], local_model, local_tokenizer,
+                                                                draft_model=draft_model, on_text=on_text,
+                                                                transcription=transcription, on_chunk=on_chunk)
+    logger.debug("Summarized Feedback: %s", summarized_feedback)
     transcription["summarized_feedback"] = summarized_feedback
-    
-    transcription["duration"] = duration
-    transcription["uploaded_at"] = upload_time
+
+    transcription["duration"] = job["duration"]
+    transcription["uploaded_at"] = job["upload_time"]
+
+    # Whisper's token ids are not used past transcription
+    for segment in transcription["segments"]:
+        segment.pop("tokens", None)
 
     # Save the updated transcription with all metadata
-    merged_results_file = os.path.join(output_dir, "analysis_results.json")
+    merged_results_file = os.path.join(job["output_dir"], "analysis_results.json")
     with open(merged_results_file, "w", encoding="utf-8") as f:
-        json.dump(transcription, f, ensure_ascii=False, indent=4)
-    print(f"Analysis results saved to {merged_results_file}")
+        json.dump(transcription, f, ensure_ascii=False, separators=(",", ":"))
+    logger.info("Analysis results saved to %s", merged_results_file)
 
-    return output_dir
+    # The decoded audio is no longer needed once the results are written
+    job.pop("data", None)
+    job.pop("loudness", None)
+    return job
 
-import numpy as np
+# Stages in order; the staged engine gives each its own queue and workers
+PIPELINE_STAGES = tuple(zip(PIPELINE_STAGE_NAMES, (transcribe_stage, analyze_stage, summarize_stage)))
+
+def preprocess_audio_pipeline(input_file, base_output_dir, model_name="base", prompt=None, export_segment_files=False, return_results=False, progress=None, streaming=None):
+    """
+    Complete transcription and text analysis pipeline.
+    Returns the output directory, or (output_dir, results) with return_results=True.
+    progress, if given, is called with a dict for every stage transition and analyzed segment.
+    streaming transcribes in windows and analyzes segments while Whisper is still running;
+    by default it is used for recordings of at least STREAMING_MIN_DURATION seconds.
+    """
+    job = new_pipeline_job(input_file, base_output_dir, model_name, prompt, export_segment_files, progress, streaming)
+    for _, stage in PIPELINE_STAGES:
+        job = stage(job)
+
+    if return_results:
+        return job["output_dir"], job["transcription"]
+    return job["output_dir"]
 
 def calculate_pacing(segment_text, segment_duration):
     """Calculate pacing (words per second)."""
@@ -276,19 +892,254 @@ def calculate_pacing(segment_text, segment_duration):
         pacing = 0
     return pacing
 
+def compute_word_metrics(segments, filler_words=None, window_sec=5.0, long_pause_sec=1.0, loudness=None):
+    """
+    Per-word timing metrics for the whole recording in one vectorized pass over Whisper's
+    word timestamps. Each segment's nested "words" list is consumed and replaced by
+    columnar arrays, so results hold a handful of flat lists instead of a dict per word.
+    """
+    words, starts, ends, segment_index = [], [], [], []
+    for index, segment in enumerate(segments):
+        for word in segment.pop("words", None) or []:
+            words.append(word["word"].strip())
+            starts.append(word["start"])
+            ends.append(word["end"])
+            segment_index.append(index)
+
+    count = len(words)
+    if count == 0:
+        return {"count": 0}
+
+    start = np.asarray(starts, dtype=np.float32)
+    end = np.asarray(ends, dtype=np.float32)
+    duration = np.maximum(end - start, 0)
+
+    # Silence between the end of the previous word and the start of this one
+    pause_before = np.zeros(count, dtype=np.float32)
+    pause_before[1:] = np.maximum(start[1:] - end[:-1], 0)
+
+    # Local speaking rate: words starting within window_sec centred on each word
+    half_window = window_sec / 2
+    window_lo = np.searchsorted(start, start - half_window, side="left")
+    window_hi = np.searchsorted(start, start + half_window, side="right")
+    local_rate = (window_hi - window_lo) / np.float32(window_sec)
+
+    # Fillers: fillers.py's matcher on the words themselves, so they agree with the segment counts
+    filler_indices = filler_word_indices(words, filler_words)
+
+    pauses = pause_before[1:]
+    metrics = {
+        "count": count,
+        "word": words,
+        "segment_index": segment_index,
+        "start": start.round(3).tolist(),
+        "end": end.round(3).tolist(),
+        "duration": duration.round(3).tolist(),
+        "pause_before": pause_before.round(3).tolist(),
+        "local_rate_wps": local_rate.round(3).tolist(),
+        "window_sec": window_sec,
+        "filler_indices": filler_indices,
+        "mean_pause_sec": float(pauses.mean()) if len(pauses) else 0.0,
+        "long_pauses": int((pauses >= long_pause_sec).sum()),
+        "long_pause_sec": long_pause_sec,
+    }
+    if loudness is not None:
+        metrics["volume"] = loudness_rms(loudness, start, end).round(5).tolist()
+    return metrics
+
+def compute_loudness(data, rate, frame_sec=0.01):
+    """
+    Frame-level loudness of the whole recording in one vectorized pass: the float32 signal is
+    reshaped (a view, no copy) into fixed frames and each frame's mean square is taken.
+    A running sum of the frame energies makes the RMS of any time span an O(1) lookup.
+    """
+    frame_len = max(1, int(frame_sec * rate))
+    frame_count = max(1, -(-len(data) // frame_len))
+    samples = np.asarray(data, dtype=np.float32)
+    full_frames = len(samples) // frame_len
+    mean_square = np.zeros(frame_count, dtype=np.float32)
+    if full_frames:
+        frames = samples[:full_frames * frame_len].reshape(full_frames, frame_len)
+        mean_square[:full_frames] = np.einsum("ij,ij->i", frames, frames) / frame_len
+    tail = samples[full_frames * frame_len:]
+    if len(tail):
+        mean_square[-1] = np.dot(tail, tail) / len(tail)
+    return {
+        "frame_sec": frame_len / rate,
+        "mean_square": mean_square,
+        "cumulative": np.concatenate(([0.0], np.cumsum(mean_square, dtype=np.float64))),
+    }
+
+def loudness_rms(loudness, start_sec, end_sec):
+    """RMS over [start_sec, end_sec) for scalars or arrays of spans, from the loudness running sum."""
+    frame_count = len(loudness["mean_square"])
+    first = np.clip(np.floor(np.asarray(start_sec) / loudness["frame_sec"]).astype(np.int64), 0, frame_count - 1)
+    last = np.clip(np.ceil(np.asarray(end_sec) / loudness["frame_sec"]).astype(np.int64), first + 1, frame_count)
+    cumulative = loudness["cumulative"]
+    return np.sqrt((cumulative[last] - cumulative[first]) / (last - first))
+
+def segment_volumes(loudness, segments):
+    """Volume (RMS) of every segment by index lookups into the loudness envelope."""
+    starts = np.array([segment["start"] for segment in segments], dtype=np.float64)
+    ends = np.array([segment["end"] for segment in segments], dtype=np.float64)
+    return [float(volume) for volume in loudness_rms(loudness, starts, ends)] if segments else []
+
+def loudness_envelope(loudness, max_points=2000, min_frame_sec=0.05):
+    """Downsampled RMS and dBFS envelope, at most max_points long, for waveform display."""
+    mean_square = loudness["mean_square"]
+    group = max(int(np.ceil(min_frame_sec / loudness["frame_sec"])), int(np.ceil(len(mean_square) / max_points)), 1)
+    padded = np.zeros(-(-len(mean_square) // group) * group, dtype=np.float32)
+    padded[:len(mean_square)] = mean_square
+    rms = np.sqrt(padded.reshape(-1, group).mean(axis=1))
+    db = 20 * np.log10(np.maximum(rms, 1e-5))
+    return {
+        "frame_sec": group * loudness["frame_sec"],
+        "rms": rms.round(5).tolist(),
+        "db": db.round(1).tolist(),
+    }
+
 def calculate_volume(segment_data):
     """Calculate average volume (RMS) for a segment."""
     rms = np.sqrt(np.mean(np.square(segment_data.astype(float))))
     return rms
 
+def detect_speech_regions(loudness, duration=None, min_speech_sec=0.25, min_silence_sec=0.4, pad_sec=0.15, margin_db=12.0, floor_db=-55.0):
+    """
+    Speech regions as [(start_sec, end_sec)] from the loudness frames, without another pass
+    over the audio. A frame is speech when it is margin_db above the recording's noise floor
+    (its quietest 10% of frames) and above floor_db; gaps shorter than min_silence_sec are
+    bridged, blips shorter than min_speech_sec dropped, and regions padded by pad_sec.
+    """
+    frame_sec = loudness["frame_sec"]
+    db = 10 * np.log10(np.maximum(loudness["mean_square"], 1e-10))
+    if duration is None:
+        duration = len(db) * frame_sec
+    threshold = max(np.percentile(db, 10) + margin_db, floor_db)
+    speech = db > threshold
+    if not speech.any():
+        return []
+
+    # Run boundaries of the speech mask: starts where it turns on, ends where it turns off
+    edges = np.diff(np.concatenate(([False], speech, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Bridge short gaps, then drop short regions
+    keep_gap = (starts[1:] - ends[:-1]) * frame_sec >= min_silence_sec
+    starts = starts[np.concatenate(([True], keep_gap))]
+    ends = ends[np.concatenate((keep_gap, [True]))]
+    long_enough = (ends - starts) * frame_sec >= min_speech_sec
+    starts, ends = starts[long_enough], ends[long_enough]
+
+    regions = []
+    for start, end in zip(starts * frame_sec - pad_sec, ends * frame_sec + pad_sec):
+        start, end = max(0.0, float(start)), min(duration, float(end))
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)  # Padding closed the gap
+        else:
+            regions.append((start, end))
+    return regions
+
+def silence_stats(regions, duration):
+    """Silence around and between speech regions, reported as a pause metric."""
+    speech_sec = sum(end - start for start, end in regions)
+    pauses = [next_start - end for (_, end), (next_start, _) in zip(regions, regions[1:])]
+    return {
+        "speech_sec": speech_sec,
+        "silence_sec": max(0.0, duration - speech_sec),
+        "silence_ratio": max(0.0, duration - speech_sec) / duration if duration else 0.0,
+        "leading_silence_sec": regions[0][0] if regions else duration,
+        "trailing_silence_sec": duration - regions[-1][1] if regions else 0.0,
+        "pause_count": len(pauses),
+        "mean_pause_sec": float(np.mean(pauses)) if pauses else 0.0,
+        "longest_pause_sec": max(pauses, default=0.0),
+        "regions": [[round(start, 2), round(end, 2)] for start, end in regions],
+    }
+
+def condense_speech(data, rate, regions, gap_sec=0.3):
+    """
+    The speech regions joined into one array with short silent gaps, for the heavy models,
+    plus the map of (condensed start, original start, original end) per region.
+    """
+    gap = np.zeros(int(gap_sec * rate), dtype=data.dtype)
+    pieces, speech_map, position = [], [], 0
+    for start, end in regions:
+        first, last = int(start * rate), int(end * rate)
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+        speech_map.append((position / rate, start, end))
+        pieces.append(data[first:last])
+        position += last - first
+    return np.concatenate(pieces), np.array(speech_map, dtype=np.float64)
+
+def to_original_time(times, speech_map, snap="end"):
+    """
+    Map condensed-audio times back onto the original recording. Times inside an inserted gap
+    snap to the end of the region before it, or with snap="start" to the start of the next.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    index = np.clip(np.searchsorted(speech_map[:, 0], times, side="right") - 1, 0, len(speech_map) - 1)
+    offset = times - speech_map[index, 0]
+    length = speech_map[index, 2] - speech_map[index, 1]
+    original = speech_map[index, 1] + np.minimum(offset, length)
+    if snap == "start":
+        in_gap = (offset > length) & (index + 1 < len(speech_map))
+        original = np.where(in_gap, speech_map[np.minimum(index + 1, len(speech_map) - 1), 1], original)
+    return original
+
+def merge_segment(into, segment):
+    """
+    Fold a zero-length segment's text and words into a neighbouring segment, in time order.
+    The neighbour keeps its timestamps; the merged words are clamped into them.
+    """
+    before = segment["start"] < into["start"]
+    into["text"] = segment["text"] + into["text"] if before else into["text"] + segment["text"]
+    words = [dict(word, start=min(max(word["start"], into["start"]), into["end"]),
+                  end=min(max(word["end"], into["start"]), into["end"]))
+             for word in segment.get("words") or []]
+    if words:
+        into["words"] = words + into.get("words", []) if before else into.get("words", []) + words
+
+def remap_segments(segments, speech_map):
+    """
+    Move segment and word timestamps from the condensed speech audio to the original timeline,
+    in place. A segment that lay entirely in an inserted gap maps to zero length and has no
+    audio to analyze; it is merged into the previous segment (or the next, if it is first).
+    Returns the segments that remain.
+    """
+    kept, orphans = [], []
+    for segment in segments:
+        start = float(to_original_time(segment["start"], speech_map, snap="start"))
+        segment["start"], segment["end"] = start, max(start, float(to_original_time(segment["end"], speech_map)))
+        words = segment.get("words") or []
+        if words:
+            starts = to_original_time([word["start"] for word in words], speech_map, snap="start")
+            ends = to_original_time([word["end"] for word in words], speech_map)
+            for word, start, end in zip(words, starts, ends):
+                word["start"], word["end"] = float(start), float(max(start, end))
+        if segment["end"] <= segment["start"]:
+            if kept:
+                merge_segment(kept[-1], segment)
+            else:
+                orphans.append(segment)
+            continue
+        for orphan in orphans:
+            merge_segment(segment, orphan)
+        orphans.clear()
+        kept.append(segment)
+    return kept
+
 
 # Run the pipeline
 if __name__ == "__main__":
+    from observability import configure_logging
+    configure_logging()
     base_output_directory = "transcriptions"
     os.makedirs(base_output_directory, exist_ok=True)
 
-    # Example: Process a new file
-    input_audio = "bernie.wav"
+    # Process the file given on the command line, or a bundled sample
+    input_audio = sys.argv[1] if len(sys.argv) > 1 else "kimmi1.wav"
     # Custom prompts to filter influencies back in
     custom_prompt = "uh, um, ah, like, you know, well, hmm, uh-huh, okay..."
     output_dir = preprocess_audio_pipeline(
@@ -0,0 +1,251 @@
+import os
+import logging
+from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from threading import Lock, Thread, Event
+
+from pipeline_config import PIPELINE_STAGE_NAMES
+
+# Where preprocess_audio_pipeline runs: "thread" runs it in the calling scheduler
+# thread, "process" hands it to a pool of long-lived worker processes with warm models,
+# "staged" runs transcribe/analyze/summarize on separate stage workers so jobs overlap.
+EXECUTION_BACKENDS = ("thread", "process", "staged")
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process: queue carrying (job_key, event) progress events back to the server
+_progress_queue = None
+
+# job_key of queue items that carry a pipeline span (name, wall_sec, cpu_sec) for the server's metrics
+SPAN_KEY = "__span__"
+# Sent as a job's last progress event, once every other event of that job is on the queue
+STREAM_END = "__end__"
+# How long run() waits for a job's remaining progress events after its result arrives
+PROGRESS_DRAIN_TIMEOUT = 10
+
+
+class WorkerCrashed(RuntimeError):
+    """Raised when the worker process running a job died; the job itself may be fine."""
+
+
+def _init_worker(model_specs, torch_threads, progress_queue=None):
+    """Runs once in each worker process: import the ML stack and load the models."""
+    global _progress_queue
+    _progress_queue = progress_queue
+    import torch
+    import ai_scripts  # noqa: F401 - registers the model loaders
+    from model_registry import warm_up
+    from observability import configure_logging, set_span_forwarder
+
+    configure_logging()
+    if progress_queue is not None:
+        set_span_forwarder(lambda name, wall_sec, cpu_sec: progress_queue.put((SPAN_KEY, (name, wall_sec, cpu_sec))))
+    if torch_threads:
+        torch.set_num_threads(torch_threads)
+    logger.info("Worker process %s warming up models: %s", os.getpid(), model_specs)
+    warm_up(model_specs, background=False)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_pipeline(pipeline_kwargs, job_key=None):
+    """Runs in a worker process; the results travel back to the server over IPC."""
+    from ai_scripts import preprocess_audio_pipeline
+
+    progress = None
+    if job_key and _progress_queue is not None:
+        progress = lambda event: _progress_queue.put((job_key, event))
+    try:
+        return preprocess_audio_pipeline(return_results=True, progress=progress, **pipeline_kwargs)
+    finally:
+        if progress:
+            progress(STREAM_END)
+
+
+class ThreadBackend:
+    """Run the pipeline in the calling thread, sharing the server process's models."""
+
+    name = "thread"
+
+    def start(self):
+        pass
+
+    def wait_ready(self, timeout=None):
+        pass
+
+    def run(self, progress=None, **pipeline_kwargs):
+        from ai_scripts import preprocess_audio_pipeline
+        return preprocess_audio_pipeline(return_results=True, progress=progress, **pipeline_kwargs)
+
+    def shutdown(self):
+        pass
+
+
+class ProcessBackend:
+    """Run the pipeline in a pool of worker processes, each holding its own warm models."""
+
+    name = "process"
+
+    def __init__(self, worker_count, model_specs, torch_threads=None):
+        self.worker_count = worker_count
+        self.model_specs = model_specs
+        if torch_threads is None:
+            # Split the cores between workers so they don't oversubscribe the CPU
+            torch_threads = max(1, (os.cpu_count() or 1) // worker_count)
+        self.torch_threads = torch_threads
+        self._lock = Lock()
+        self._mp_context = get_context("spawn")
+        # Progress events from all workers share one queue, drained by a listener thread
+        self._progress_queue = self._mp_context.Queue()
+        self._progress_callbacks = {}  # job_key -> (callback, Event set when the job's stream ends)
+        self._listener = None
+        self._warm_futures = []
+        self._executor = self._create_executor()
+
+    def _create_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.worker_count,
+            mp_context=self._mp_context,
+            initializer=_init_worker,
+            initargs=(self.model_specs, self.torch_threads, self._progress_queue),
+        )
+
+    def _listen_for_progress(self):
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                return
+            job_key, event = item
+            if job_key == SPAN_KEY:
+                from observability import observe_span
+                observe_span(*event)
+                continue
+            entry = self._progress_callbacks.get(job_key)
+            if entry is None:
+                continue
+            callback, drained = entry
+            if event == STREAM_END:
+                drained.set()
+            else:
+                callback(event)
+
+    def _ensure_listener(self):
+        # Started lazily: spawned workers re-import the server module, which builds a backend
+        if self._listener is None:
+            self._listener = Thread(target=self._listen_for_progress, daemon=True)
+            self._listener.start()
+
+    def start(self):
+        """Spawn the worker processes now so their models are warm before the first upload."""
+        with self._lock:
+            self._ensure_listener()
+            self._warm_futures = [self._executor.submit(_ping) for _ in range(self.worker_count)]
+
+    def wait_ready(self, timeout=None):
+        """Block until the workers started by start() have loaded their models."""
+        for future in list(self._warm_futures):
+            future.result(timeout=timeout)
+
+    def run(self, progress=None, **pipeline_kwargs):
+        job_key = None
+        drained = Event()
+        with self._lock:
+            self._ensure_listener()
+            executor = self._executor
+            if progress:
+                job_key = str(uuid4())
+                self._progress_callbacks[job_key] = (progress, drained)
+        try:
+            result = executor.submit(_run_pipeline, pipeline_kwargs, job_key).result()
+        except BrokenProcessPool:
+            drained.set()  # The worker is gone; no more events will come
+            # A worker died (e.g. out of memory); start a fresh pool for the next jobs
+            with self._lock:
+                if self._executor is executor:
+                    logger.error("Worker process pool broke, restarting it")
+                    self._executor = self._create_executor()
+            raise WorkerCrashed("Analysis worker process crashed")
+        finally:
+            if job_key:
+                # The result can overtake the job's last progress events; deliver those first
+                if not drained.wait(PROGRESS_DRAIN_TIMEOUT):
+                    logger.warning("Progress events of job %s did not drain", job_key)
+                self._progress_callbacks.pop(job_key, None)
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            self._executor.shutdown(wait=True)
+            if self._listener is not None:
+                self._progress_queue.put(None)
+
+
+class StagedBackend:
+    """Run each pipeline stage on its own workers and queue, so one job can transcribe while another is summarized."""
+
+    name = "staged"
+
+    def __init__(self, stage_concurrency=None):
+        self.stage_concurrency = stage_concurrency or {}
+        self._lock = Lock()
+        self._engine = None
+
+    def _ensure_engine(self):
+        # Built on first use: importing the stages pulls in the whole ML stack
+        with self._lock:
+            if self._engine is None:
+                from ai_scripts import PIPELINE_STAGES
+                from staged_pipeline import StagedPipeline
+                self._engine = StagedPipeline(PIPELINE_STAGES, self.stage_concurrency)
+            return self._engine
+
+    def start(self):
+        self._ensure_engine()
+
+    def wait_ready(self, timeout=None):
+        pass
+
+    def run(self, progress=None, **pipeline_kwargs):
+        from ai_scripts import new_pipeline_job
+        job = new_pipeline_job(progress=progress, **pipeline_kwargs)
+        job = self._ensure_engine().submit(job).result()
+        return job["output_dir"], job["transcription"]
+
+    def stats(self):
+        return self._ensure_engine().stats()
+
+    def shutdown(self):
+        with self._lock:
+            if self._engine is not None:
+                self._engine.shutdown()
+
+
+def parse_stage_concurrency(spec):
+    """Parse "transcribe=1,analyze=2,summarize=1" into {stage: workers}; raises ValueError on unknown stages."""
+    concurrency = {}
+    for part in spec.split(","):
+        name, _, count = part.partition("=")
+        name = name.strip()
+        if not name:
+            continue
+        if name not in PIPELINE_STAGE_NAMES:
+            raise ValueError(f"Unknown pipeline stage '{name}' in STAGE_CONCURRENCY, expected one of {PIPELINE_STAGE_NAMES}")
+        concurrency[name] = int(count)
+        if concurrency[name] < 1:
+            raise ValueError(f"STAGE_CONCURRENCY for '{name}' must be at least 1")
+    return concurrency
+
+
+def create_backend(name, worker_count=1, model_specs=(), stage_concurrency=None):
+    """Build the execution backend named by EXECUTION_BACKEND."""
+    if name == "thread":
+        return ThreadBackend()
+    if name == "process":
+        return ProcessBackend(worker_count, list(model_specs))
+    if name == "staged":
+        return StagedBackend(stage_concurrency)
+    raise ValueError(f"Unknown execution backend '{name}', expected one of {EXECUTION_BACKENDS}")
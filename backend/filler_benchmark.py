@@ -0,0 +1,45 @@
+"""
+Benchmark the single-pass filler matcher against the original per-filler str.count analyzer.
+
+Uses the segments of the bundled sample transcription, repeated to simulate longer talks:
+
+    python filler_benchmark.py --repeat 1 10 100
+"""
+import argparse
+import re
+import timeit
+
+from fillers import analyze_fillers_batch
+from sample_transcription import bernie
+
+
+def legacy_analyze_filler_words(transcript, filler_words=None):
+    """The original analyzer: one substring count per filler (counts "well" inside "dwell")."""
+    if filler_words is None:
+        filler_words = ["uh", "um", "ah", "like", "you know", "well", "hmm"]
+    transcript = transcript.lower()
+    words = re.findall(r'\b\w+\b', transcript)
+    total_words = len(words)
+    filler_counts = {word: transcript.count(word) for word in filler_words}
+    total_fillers = sum(filler_counts.values())
+    filler_percentage = (total_fillers / total_words) * 100 if total_words > 0 else 0
+    return {"filler_counts": filler_counts, "total_fillers": total_fillers, "filler_percentage": filler_percentage}
+
+
+def run(repeat, number):
+    texts = [segment["text"] for segment in bernie["segments"]] * repeat
+    legacy = timeit.timeit(lambda: [legacy_analyze_filler_words(text) for text in texts], number=number) / number
+    batched = timeit.timeit(lambda: analyze_fillers_batch(texts), number=number) / number
+    legacy_total = sum(legacy_analyze_filler_words(text)["total_fillers"] for text in texts)
+    batched_total = sum(result["total_fillers"] for result in analyze_fillers_batch(texts))
+    print(f"{len(texts):6d} segments | legacy {legacy * 1000:8.2f} ms ({legacy_total} fillers)"
+          f" | single-pass {batched * 1000:8.2f} ms ({batched_total} fillers) | {legacy / batched:5.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--number", type=int, default=20, help="Timing runs per size")
+    args = parser.parse_args()
+    for repeat in args.repeat:
+        run(repeat, args.number)
@@ -0,0 +1,98 @@
+import re
+from bisect import bisect_right
+from functools import lru_cache
+
+DEFAULT_FILLER_WORDS = ("uh", "um", "ah", "like", "you know", "well", "hmm")
+WORD_PATTERN = re.compile(r"\w+")  # Same tokens as \b\w+\b, without the boundary checks
+
+
+@lru_cache(maxsize=16)
+def compile_filler_matcher(filler_words=DEFAULT_FILLER_WORDS, ignore_case=False):
+    """
+    One regex that finds filler phrase candidates in a single scan.
+    Multi-word fillers allow any spacing between their words and longer phrases win over
+    their prefixes. Only the end is anchored to a word boundary: a leading \\b would stop the
+    regex engine from skipping ahead by first character, so callers check the start instead.
+    """
+    phrases = sorted(filler_words, key=len, reverse=True)
+    # Whitespace other than newlines, which separate segments in analyze_fillers_batch
+    alternation = "|".join(r"[^\S\n]+".join(re.escape(part) for part in phrase.split()) for phrase in phrases)
+    return re.compile(rf"(?:{alternation})\b", re.IGNORECASE if ignore_case else 0)
+
+
+def analyze_fillers_batch(texts, filler_words=None):
+    """
+    Filler analysis for many segment texts in one pass over their concatenation.
+    Args:
+        texts (list): Segment texts.
+        filler_words (list): Filler phrases to detect (defaults to DEFAULT_FILLER_WORDS).
+    Returns:
+        list: Per segment, a dict with filler_counts, total_fillers, filler_percentage and
+        filler_positions ([start, end, filler] character offsets into that segment's text).
+    """
+    filler_words = tuple(" ".join(word.lower().split()) for word in (filler_words or DEFAULT_FILLER_WORDS))
+
+    # Newlines between segments keep matches from spanning two segments
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+    combined = "\n".join(texts)
+
+    # Matching lowercased text is much faster than re.IGNORECASE, but only keeps offsets
+    # valid when lowercasing doesn't change the length (true for all but a few Unicode letters)
+    lowered = combined.lower()
+    if len(lowered) == len(combined):
+        matcher = compile_filler_matcher(filler_words)
+        combined = lowered
+    else:
+        matcher = compile_filler_matcher(filler_words, ignore_case=True)
+
+    results = [
+        {"filler_counts": dict.fromkeys(filler_words, 0), "total_fillers": 0, "filler_positions": []}
+        for _ in texts
+    ]
+    # Only filler candidates reach Python; everything else is scanned inside the regex engine
+    position = 0
+    while True:
+        match = matcher.search(combined, position)
+        if match is None:
+            break
+        start = match.start()
+        if start > 0 and (combined[start - 1].isalnum() or combined[start - 1] == "_"):
+            # Inside a longer word ("well" in "dwell"); a real filler may still start later in it
+            position = start + 1
+            continue
+        position = match.end()
+
+        index = bisect_right(starts, start) - 1
+        result = results[index]
+        # Normalize case and inner whitespace back to the configured phrase
+        phrase = " ".join(match.group().lower().split())
+        result["filler_counts"][phrase] += 1
+        result["total_fillers"] += 1
+        result["filler_positions"].append([start - starts[index], match.end() - starts[index], phrase])
+
+    for text, result in zip(texts, results):
+        total_words = len(WORD_PATTERN.findall(text))
+        result["filler_percentage"] = (result["total_fillers"] / total_words) * 100 if total_words > 0 else 0
+    return results
+
+
+def filler_word_indices(words, filler_words=None):
+    """
+    Indices of the words that belong to a filler, for word-timestamp metrics. The words are
+    joined with spaces and matched by analyze_fillers_batch, so words and segments agree on
+    what counts ("Uh-huh," holds "uh" in both); a multi-word filler marks all its words.
+    """
+    starts = []
+    offset = 0
+    for word in words:
+        starts.append(offset)
+        offset += len(word) + 1
+    [result] = analyze_fillers_batch([" ".join(words)], filler_words)
+    indices = set()
+    for start, end, _ in result["filler_positions"]:
+        indices.update(range(bisect_right(starts, start) - 1, bisect_right(starts, end - 1)))
+    return sorted(indices)
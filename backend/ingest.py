@@ -0,0 +1,102 @@
+import os
+import wave
+import hashlib
+import subprocess
+
+# Upload ingest: the upload is copied to disk in chunks (hashed on the way), then decoded
+# by ffmpeg to a normalized 16 kHz mono 16-bit PCM WAV. Every later stage reads that
+# normalized copy instead of decoding the original again. ffmpeg reads the saved file
+# rather than a pipe, so containers that need seeking (MP4/M4A with the index at the
+# end) decode too.
+
+TARGET_SR = 16000
+SAMPLE_WIDTH = 2  # 16-bit PCM
+CHUNK_SIZE = 1024 * 1024
+
+
+class IngestError(Exception):
+    """Raised when an upload can't be ingested; status_code is the HTTP status to report."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def normalized_path_for(file_path):
+    """Where the normalized PCM copy of an upload lives."""
+    return f"{os.path.splitext(file_path)[0]}.normalized.wav"
+
+
+def _pump_pcm(stdout, pcm_path, max_samples, state):
+    """Copy ffmpeg's PCM output into a WAV file, stopping once it exceeds max_samples."""
+    with wave.open(pcm_path, "wb") as pcm_file:
+        pcm_file.setnchannels(1)
+        pcm_file.setsampwidth(SAMPLE_WIDTH)
+        pcm_file.setframerate(TARGET_SR)
+        while True:
+            chunk = stdout.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            state["samples"] += len(chunk) // SAMPLE_WIDTH
+            if max_samples and state["samples"] > max_samples:
+                state["too_long"] = True  # The caller stops ffmpeg
+                break
+            pcm_file.writeframesraw(chunk)
+
+
+def ingest_upload(source, file_path, max_bytes=None, max_duration=None):
+    """
+    Copy an uploaded file object to file_path, then decode it to normalized PCM.
+    Args:
+        source: Binary file object to read the upload from.
+        max_bytes (int): Reject uploads larger than this many bytes.
+        max_duration (float): Reject audio longer than this many seconds.
+    Returns:
+        dict: content_hash (SHA-256 of the upload), normalized_path, duration and size.
+    """
+    pcm_path = normalized_path_for(file_path)
+    max_samples = int(max_duration * TARGET_SR) if max_duration else None
+    digest = hashlib.sha256()
+    size = 0
+    state = {"samples": 0, "too_long": False}
+    decoder = None
+
+    try:
+        with open(file_path, "wb") as file_object:
+            while True:
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise IngestError(f"Upload exceeds the {max_bytes // (1024 * 1024)} MB limit", status_code=413)
+                digest.update(chunk)
+                file_object.write(chunk)
+
+        decoder = subprocess.Popen(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", file_path,
+             "-f", "s16le", "-ac", "1", "-ar", str(TARGET_SR), "pipe:1"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        _pump_pcm(decoder.stdout, pcm_path, max_samples, state)
+        if state["too_long"]:
+            raise IngestError(f"Audio exceeds the {max_duration:.0f} second limit", status_code=413)
+        if decoder.wait() != 0 or state["samples"] == 0:
+            raise IngestError("Could not decode the uploaded audio", status_code=400)
+    except BaseException:
+        if decoder is not None:
+            decoder.kill()
+            decoder.wait()
+        for path in (file_path, pcm_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return {
+        "content_hash": digest.hexdigest(),
+        "normalized_path": pcm_path,
+        "duration": state["samples"] / TARGET_SR,
+        "size": size,
+    }
@@ -0,0 +1,525 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+from uuid import uuid4
+from collections import namedtuple
+from threading import Thread, Lock, Event
+
+from scheduler import QueueFull
+
+logger = logging.getLogger(__name__)
+
+# Job queues shared by several processes, so API replicas can enqueue
+# analyses and separate inference workers can run them. Delivery is at-least-once: a
+# claimed job is leased to one worker, kept alive by heartbeats, and handed to another
+# worker if the lease runs out (the worker died or hung) before the job is acknowledged.
+# SQLiteJobQueue needs only a file on the local disk (WAL mode is not safe on a network
+# filesystem, so its processes must share one host); RedisJobQueue has the same
+# interface on Redis.
+
+DEFAULT_LEASE_SEC = 60
+DEFAULT_MAX_ATTEMPTS = 3
+
+# A claimed job; token identifies this lease in heartbeat/ack/nack calls
+Lease = namedtuple("Lease", ["job_id", "payload", "token", "attempts"])
+# A job given up on after max_attempts, handed to the dead-letter handler once
+DeadJob = namedtuple("DeadJob", ["job_id", "payload", "error"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state_enqueued_at ON jobs (state, enqueued_at);
+CREATE INDEX IF NOT EXISTS jobs_state_lease_expires ON jobs (state, lease_expires);
+"""
+
+
+class SQLiteJobQueue:
+    """Job queue in a SQLite file; every process that opens the same file shares it."""
+
+    def __init__(self, db_path="jobs.db", max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._lock = Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two processes can't both
+        # read the same job as claimable
+        self._conn.execute("BEGIN IMMEDIATE")
+
+    def enqueue(self, job_id, payload, max_queued=None):
+        """Add a job, or reset it if job_id is already queued; raises QueueFull past max_queued."""
+        with self._lock:
+            self._transaction()
+            try:
+                queued = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND job_id != ?", (job_id,)).fetchone()[0]
+                if max_queued is not None and queued >= max_queued:
+                    raise QueueFull(f"Job queue is full ({max_queued} jobs waiting)")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs (job_id, payload, state, enqueued_at) VALUES (?, ?, 'queued', ?)",
+                    (job_id, json.dumps(payload), time.time()),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def _release_expired(self, now):
+        """Put jobs whose lease ran out back in the queue, or bury them after max_attempts."""
+        self._conn.execute(
+            "UPDATE jobs SET state = 'dead', last_error = 'Lease expired', lease_token = NULL "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, self.max_attempts),
+        )
+        expired = self._conn.execute(
+            "UPDATE jobs SET state = 'queued', lease_owner = NULL, lease_token = NULL, lease_expires = NULL "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (now,),
+        ).rowcount
+        if expired:
+            logger.warning("Re-queued %d jobs whose lease expired", expired)
+
+    def claim(self, owner, lease_sec=DEFAULT_LEASE_SEC):
+        """Lease the oldest queued job to owner for lease_sec seconds; None if there is none."""
+        now = time.time()
+        with self._lock:
+            self._transaction()
+            try:
+                self._release_expired(now)
+                row = self._conn.execute(
+                    "SELECT job_id, payload, attempts FROM jobs WHERE state = 'queued' "
+                    "ORDER BY enqueued_at LIMIT 1").fetchone()
+                if row is None:
+                    self._conn.commit()
+                    return None
+                job_id, payload, attempts = row
+                token = uuid4().hex
+                self._conn.execute(
+                    "UPDATE jobs SET state = 'leased', attempts = attempts + 1, lease_owner = ?, lease_token = ?, "
+                    "lease_expires = ? WHERE job_id = ?",
+                    (owner, token, now + lease_sec, job_id),
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return Lease(job_id, json.loads(payload), token, attempts + 1)
+
+    def _update_lease(self, sql, params):
+        with self._lock:
+            changed = self._conn.execute(sql, params).rowcount
+            self._conn.commit()
+        return changed == 1
+
+    def heartbeat(self, job_id, token, lease_sec=DEFAULT_LEASE_SEC):
+        """Extend a lease; False if it was lost (expired and given to another worker)."""
+        return self._update_lease(
+            "UPDATE jobs SET lease_expires = ? WHERE job_id = ? AND lease_token = ? AND state = 'leased'",
+            (time.time() + lease_sec, job_id, token))
+
+    def ack(self, job_id, token):
+        """Remove a finished job; False if the lease was lost in the meantime."""
+        return self._update_lease("DELETE FROM jobs WHERE job_id = ? AND lease_token = ?", (job_id, token))
+
+    def nack(self, job_id, token, error=None):
+        """Give a job back for another attempt, or bury it once it has used max_attempts."""
+        return self._update_lease(
+            "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'dead' ELSE 'queued' END, last_error = ?, "
+            "lease_owner = NULL, lease_token = NULL, lease_expires = NULL WHERE job_id = ? AND lease_token = ?",
+            (self.max_attempts, error, job_id, token))
+
+    def take_dead(self, limit=100):
+        """Remove and return up to limit jobs that were given up on."""
+        with self._lock:
+            self._transaction()
+            try:
+                rows = self._conn.execute(
+                    "SELECT job_id, payload, last_error FROM jobs WHERE state = 'dead' LIMIT ?", (limit,)).fetchall()
+                self._conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(row[0],) for row in rows])
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return [DeadJob(job_id, json.loads(payload), error) for job_id, payload, error in rows]
+
+    def cancel(self, job_id):
+        """Drop a job that has not been claimed; True if there was one."""
+        return self._update_lease("DELETE FROM jobs WHERE job_id = ? AND state = 'queued'", (job_id,))
+
+    def position(self, job_id):
+        """1-based position of a waiting job, 0 if it is leased, None if unknown."""
+        with self._lock:
+            row = self._conn.execute("SELECT state, enqueued_at FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+            if row is None or row[0] == "dead":
+                return None
+            if row[0] == "leased":
+                return 0
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state = 'queued' AND enqueued_at <= ?", (row[1],)).fetchone()[0]
+
+    def stats(self):
+        """{state: number of jobs} for queued, leased and dead."""
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+        return {state: counts.get(state, 0) for state in ("queued", "leased", "dead")}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Redis layout under a key prefix: a sorted set of queued job ids scored by enqueue time,
+# a sorted set of leased job ids scored by lease expiry, a list of dead job ids and one
+# hash per job. Every change is a Lua script (atomic on the server) touching only the keys
+# passed in KEYS; the prefix is a hash tag, so on Redis Cluster they share one slot.
+_ENQUEUE = """
+if ARGV[4] ~= '' and redis.call('ZCARD', KEYS[1]) - (redis.call('ZSCORE', KEYS[1], ARGV[1]) and 1 or 0) >= tonumber(ARGV[4]) then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('DEL', KEYS[3])
+redis.call('HSET', KEYS[3], 'payload', ARGV[2], 'enqueued_at', ARGV[3], 'attempts', 0, 'state', 'queued')
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+return 1
+"""
+
+_EXPIRE = """
+local expires = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if not expires or tonumber(expires) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[4], 'token', 'owner')
+if tonumber(redis.call('HGET', KEYS[4], 'attempts') or '0') >= tonumber(ARGV[3]) then
+    redis.call('HSET', KEYS[4], 'state', 'dead', 'last_error', 'Lease expired')
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+else
+    redis.call('HSET', KEYS[4], 'state', 'queued')
+    redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[4], 'enqueued_at'), ARGV[1])
+end
+return 1
+"""
+
+_CLAIM = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+    return false
+end
+local attempts = redis.call('HINCRBY', KEYS[3], 'attempts', 1)
+redis.call('HSET', KEYS[3], 'state', 'leased', 'token', ARGV[3], 'owner', ARGV[4])
+redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+return {redis.call('HGET', KEYS[3], 'payload'), attempts}
+"""
+
+_HEARTBEAT = """
+if redis.call('HGET', KEYS[2], 'token') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+return 1
+"""
+
+_ACK = """
+if redis.call('HGET', KEYS[2], 'token') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2])
+return 1
+"""
+
+_NACK = """
+if redis.call('HGET', KEYS[4], 'token') ~= ARGV[2] then
+    return 0
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('HDEL', KEYS[4], 'token', 'owner')
+redis.call('HSET', KEYS[4], 'last_error', ARGV[3])
+if tonumber(redis.call('HGET', KEYS[4], 'attempts')) >= tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[4], 'state', 'dead')
+    redis.call('RPUSH', KEYS[3], ARGV[1])
+else
+    redis.call('HSET', KEYS[4], 'state', 'queued')
+    redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[4], 'enqueued_at'), ARGV[1])
+end
+return 1
+"""
+
+
+def _text(value):
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+class RedisJobQueue:
+    """SQLiteJobQueue's interface on a Redis server (any client with redis-py's API)."""
+
+    def __init__(self, client, prefix="{nwhacks:jobs}", max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.client = client
+        self.max_attempts = max_attempts
+        self._queued = f"{prefix}:queued"
+        self._leased = f"{prefix}:leased"
+        self._dead = f"{prefix}:dead"
+        self._job_prefix = f"{prefix}:job:"
+        self._enqueue = client.register_script(_ENQUEUE)
+        self._expire = client.register_script(_EXPIRE)
+        self._claim = client.register_script(_CLAIM)
+        self._heartbeat = client.register_script(_HEARTBEAT)
+        self._ack = client.register_script(_ACK)
+        self._nack = client.register_script(_NACK)
+
+    def _job_key(self, job_id):
+        return self._job_prefix + job_id
+
+    def enqueue(self, job_id, payload, max_queued=None):
+        added = self._enqueue(
+            keys=[self._queued, self._leased, self._job_key(job_id)],
+            args=[job_id, json.dumps(payload), time.time(), "" if max_queued is None else max_queued])
+        if not added:
+            raise QueueFull(f"Job queue is full ({max_queued} jobs waiting)")
+
+    def _release_expired(self, now):
+        expired = 0
+        for job_id in self.client.zrangebyscore(self._leased, "-inf", f"({now}"):
+            job_id = _text(job_id)
+            # Checked again in the script: the lease may have been renewed since
+            expired += self._expire(keys=[self._queued, self._leased, self._dead, self._job_key(job_id)],
+                                    args=[job_id, now, self.max_attempts])
+        if expired:
+            logger.warning("Released %d jobs whose lease expired", expired)
+
+    def claim(self, owner, lease_sec=DEFAULT_LEASE_SEC):
+        now = time.time()
+        self._release_expired(now)
+        token = uuid4().hex
+        while True:
+            head = self.client.zrange(self._queued, 0, 0)
+            if not head:
+                return None
+            job_id = _text(head[0])
+            claimed = self._claim(keys=[self._queued, self._leased, self._job_key(job_id)],
+                                  args=[job_id, now + lease_sec, token, owner])
+            if claimed:
+                payload, attempts = claimed
+                return Lease(job_id, json.loads(_text(payload)), token, int(attempts))
+            # Another worker took that job first; try the new head
+
+    def heartbeat(self, job_id, token, lease_sec=DEFAULT_LEASE_SEC):
+        return bool(self._heartbeat(keys=[self._leased, self._job_key(job_id)],
+                                    args=[job_id, token, time.time() + lease_sec]))
+
+    def ack(self, job_id, token):
+        return bool(self._ack(keys=[self._leased, self._job_key(job_id)], args=[job_id, token]))
+
+    def nack(self, job_id, token, error=None):
+        return bool(self._nack(keys=[self._queued, self._leased, self._dead, self._job_key(job_id)],
+                               args=[job_id, token, error or "", self.max_attempts]))
+
+    def take_dead(self, limit=100):
+        dead = []
+        while len(dead) < limit:
+            job_id = self.client.lpop(self._dead)
+            if job_id is None:
+                break
+            job_id = _text(job_id)
+            job = {_text(key): _text(value) for key, value in self.client.hgetall(self._job_key(job_id)).items()}
+            self.client.delete(self._job_key(job_id))
+            if "payload" in job:
+                dead.append(DeadJob(job_id, json.loads(job["payload"]), job.get("last_error")))
+        return dead
+
+    def cancel(self, job_id):
+        if self.client.zrem(self._queued, job_id):
+            self.client.delete(self._job_key(job_id))
+            return True
+        return False
+
+    def position(self, job_id):
+        rank = self.client.zrank(self._queued, job_id)
+        if rank is not None:
+            return rank + 1
+        return 0 if self.client.zscore(self._leased, job_id) is not None else None
+
+    def stats(self):
+        return {"queued": self.client.zcard(self._queued), "leased": self.client.zcard(self._leased),
+                "dead": self.client.llen(self._dead)}
+
+    def close(self):
+        self.client.close()
+
+
+def create_job_queue(kind, path="jobs.db", url=None, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """A shared job queue: "sqlite" (a file at path) or "redis" (at url, needs the redis package)."""
+    if kind == "sqlite":
+        return SQLiteJobQueue(path, max_attempts=max_attempts)
+    if kind == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("JOB_QUEUE=redis needs the redis package (pip install redis)")
+        return RedisJobQueue(redis.Redis.from_url(url or "redis://localhost:6379/0"), max_attempts=max_attempts)
+    raise ValueError(f"Unknown job queue '{kind}', expected 'sqlite' or 'redis'")
+
+
+# Job handlers by name: queued jobs carry the name, and each worker process resolves it
+_handlers = {}
+# Called as fn(job_id, args, error) when a job of the named handler is given up on
+_dead_letter_handlers = {}
+
+
+def register_job_handler(fn):
+    _handlers[fn.__name__] = fn
+    return fn
+
+
+def register_dead_letter_handler(job_handler):
+    """Decorator registering what to do when a job_handler job exhausts its attempts."""
+    def register(fn):
+        _dead_letter_handlers[job_handler.__name__] = fn
+        return fn
+    return register
+
+
+class DistributedScheduler:
+    """
+    JobScheduler's interface on a shared job queue. submit() enqueues for any worker in
+    the cluster; worker_count consumer threads here claim jobs, heartbeat while running
+    them and acknowledge them when done. With worker_count=0 this process only enqueues.
+    A job whose handler raises is retried; once it has used its attempts, the handler's
+    dead-letter handler is called.
+    """
+
+    # Handlers may raise to have a job retried
+    retries = True
+
+    def __init__(self, job_queue, worker_count=1, max_queue=16, lease_sec=DEFAULT_LEASE_SEC,
+                 poll_interval=1.0, worker_id=None):
+        self.queue = job_queue
+        self.worker_count = worker_count
+        self.max_queue = max_queue
+        self.lease_sec = lease_sec
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._running = set()
+        self._lock = Lock()
+        self._stopping = Event()
+        self._workers = []
+
+    def start(self):
+        """Start the consumer threads; kept out of __init__ so spawned processes don't consume."""
+        for i in range(self.worker_count):
+            worker = Thread(target=self._worker_loop, args=(f"{self.worker_id}-{i}",), name=f"job-consumer-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, job_id, fn, *args):
+        """Queue fn(*args) cluster-wide; fn must be registered with register_job_handler."""
+        if self._stopping.is_set():
+            raise QueueFull("Scheduler is shutting down")
+        if fn.__name__ not in _handlers:
+            raise ValueError(f"{fn.__name__} is not a registered job handler")
+        self.queue.enqueue(job_id, {"handler": fn.__name__, "args": list(args)}, max_queued=self.max_queue)
+
+    def is_full(self):
+        return self.queue.stats()["queued"] >= self.max_queue
+
+    def queue_position(self, job_id):
+        return self.queue.position(job_id)
+
+    def stats(self):
+        queue_stats = self.queue.stats()
+        with self._lock:
+            running_here = len(self._running)
+        return {
+            "workers": self.worker_count,
+            "max_queue": self.max_queue,
+            "queued": queue_stats["queued"],
+            "running": queue_stats["leased"],
+            "running_here": running_here,
+            "dead": queue_stats["dead"],
+        }
+
+    def _handle_dead(self):
+        try:
+            dead = self.queue.take_dead()
+        except Exception:
+            logger.exception("Could not read dead jobs")
+            return
+        for job in dead:
+            logger.error("Giving up on job %s: %s", job.job_id, job.error)
+            on_dead = _dead_letter_handlers.get(job.payload.get("handler"))
+            if on_dead is None:
+                continue
+            try:
+                on_dead(job.job_id, job.payload.get("args", []), job.error)
+            except Exception:
+                logger.exception("Dead-letter handler failed for job %s", job.job_id)
+
+    def _heartbeat_loop(self, lease, done):
+        # Renew at a third of the lease so one slow write doesn't lose it
+        while not done.wait(self.lease_sec / 3):
+            if not self.queue.heartbeat(lease.job_id, lease.token, self.lease_sec):
+                logger.warning("Lost the lease on job %s; another worker may run it again", lease.job_id)
+                return
+
+    def _worker_loop(self, owner):
+        while not self._stopping.is_set():
+            try:
+                lease = self.queue.claim(owner, self.lease_sec)
+            except Exception:
+                logger.exception("Could not claim a job")
+                lease = None
+            # Claiming releases expired leases, so jobs may have died since the last pass
+            self._handle_dead()
+            if lease is None:
+                self._stopping.wait(self.poll_interval)
+                continue
+            if lease.attempts > 1:
+                logger.warning("Job %s redelivered (attempt %d)", lease.job_id, lease.attempts)
+            with self._lock:
+                self._running.add(lease.job_id)
+            done = Event()
+            heartbeat = Thread(target=self._heartbeat_loop, args=(lease, done), daemon=True)
+            heartbeat.start()
+            error = None
+            try:
+                _handlers[lease.payload["handler"]](*lease.payload["args"])
+            except Exception as e:
+                logger.exception("Unhandled error in job %s", lease.job_id)
+                error = str(e)
+            finally:
+                done.set()
+                heartbeat.join()
+                with self._lock:
+                    self._running.discard(lease.job_id)
+            # Acknowledged only after the handler returns: a crash before this point
+            # leaves the lease to expire and the job is delivered again
+            settled = self.queue.ack(lease.job_id, lease.token) if error is None else \
+                self.queue.nack(lease.job_id, lease.token, error)
+            if not settled:
+                logger.warning("Job %s finished after its lease was lost", lease.job_id)
+            elif error is not None:
+                self._handle_dead()
+
+    def shutdown(self, cancel_pending=True, timeout=None):
+        """
+        Stop claiming jobs and wait for the running ones to finish. Queued jobs stay in the
+        shared queue for other workers (or this one after a restart), so none are returned.
+        """
+        self._stopping.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        return []
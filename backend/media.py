@@ -0,0 +1,126 @@
+import io
+import os
+import logging
+import wave
+import mimetypes
+import subprocess
+
+# Audio delivery: content types, a compressed Opus rendition made once per upload for
+# playback, HTTP byte ranges for seeking, and clips cut from the normalized PCM copy.
+
+logger = logging.getLogger(__name__)
+
+RENDITION_MEDIA_TYPE = "audio/ogg"
+RENDITION_BITRATE = "32k"  # Plenty for speech
+MAX_CLIP_SECONDS = 300
+
+# mimetypes' table depends on the system's mime.types; pin the formats we accept
+AUDIO_MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".mp4": "audio/mp4",
+    ".aac": "audio/aac",
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".oga": "audio/ogg",
+    ".webm": "audio/webm",
+    ".flac": "audio/flac",
+}
+
+
+class InvalidRange(ValueError):
+    """Raised for a Range header that can't be satisfied for the file."""
+
+
+def media_type_for(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in AUDIO_MEDIA_TYPES:
+        return AUDIO_MEDIA_TYPES[extension]
+    return mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+
+
+def rendition_path_for(file_path):
+    """Where the compressed playback copy of an upload lives."""
+    return f"{os.path.splitext(file_path)[0]}.rendition.ogg"
+
+
+def encode_rendition(pcm_path, rendition_path, bitrate=RENDITION_BITRATE):
+    """Encode the normalized PCM to Ogg/Opus; written to a temporary name and moved into place."""
+    tmp_path = f"{rendition_path}.tmp"
+    try:
+        subprocess.run(
+            ["ffmpeg", "-nostdin", "-loglevel", "error", "-y", "-i", pcm_path,
+             "-c:a", "libopus", "-b:a", bitrate, "-application", "voip", "-f", "ogg", tmp_path],
+            check=True,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        os.replace(tmp_path, rendition_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.warning("Could not encode playback rendition of %s: %s", pcm_path, e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return None
+    return rendition_path
+
+
+def parse_range(header, size):
+    """
+    Parse a single "bytes=start-end" Range header into an inclusive (start, end).
+    Returns None when there is no usable header (serve the whole file).
+    """
+    if not header or not header.startswith("bytes="):
+        return None
+    spec = header[len("bytes="):].strip()
+    if "," in spec:
+        return None  # Multipart ranges aren't worth supporting for audio; send everything
+    start_text, _, end_text = spec.partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start = max(0, size - int(end_text))
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise InvalidRange(f"Range {header} not satisfiable for {size} bytes")
+    return start, min(end, size - 1)
+
+
+def iter_file_range(file_path, start, end, chunk_size=256 * 1024):
+    """Yield the bytes of file_path from start to end inclusive."""
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def cut_clip(pcm_path, start_sec, end_sec):
+    """A WAV clip of the normalized PCM between start_sec and end_sec, read by seeking."""
+    if end_sec <= start_sec:
+        raise ValueError("Clip end must be after its start")
+    if end_sec - start_sec > MAX_CLIP_SECONDS:
+        raise ValueError(f"Clips are limited to {MAX_CLIP_SECONDS} seconds")
+    with wave.open(pcm_path, "rb") as source:
+        rate = source.getframerate()
+        first = min(int(max(start_sec, 0) * rate), source.getnframes())
+        last = min(int(end_sec * rate), source.getnframes())
+        source.setpos(first)
+        frames = source.readframes(last - first)
+        params = source.getparams()
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as clip:
+        clip.setparams(params)
+        clip.writeframes(frames)
+    return buffer.getvalue()
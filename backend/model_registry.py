@@ -0,0 +1,124 @@
+import os
+import time
+import logging
+from threading import Lock, Thread
+
+# Process-wide model registry: every model is loaded lazily, once per process,
+# and shared by every thread that asks for it.
+_loaders = {}
+_models = {}
+_model_stats = {}
+_model_locks = {}
+_inference_locks = {}
+_registry_lock = Lock()
+
+logger = logging.getLogger(__name__)
+
+
+def register_loader(kind, loader):
+    """Register the function used to load models of a given kind (e.g. "whisper")."""
+    _loaders[kind] = loader
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+def _parameter_mb(obj):
+    """Size of a torch model's parameters in MB, summed over tuples like (model, tokenizer)."""
+    objs = obj if isinstance(obj, (tuple, list)) else (obj,)
+    total = 0
+    for o in objs:
+        if hasattr(o, "parameters"):
+            total += sum(p.numel() * p.element_size() for p in o.parameters())
+    return total / (1024 * 1024)
+
+
+def get_model(kind, name):
+    """Return the model for (kind, name), loading it on first use."""
+    key = (kind, name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _registry_lock:
+        model_lock = _model_locks.setdefault(key, Lock())
+
+    # Per-model lock so concurrent uploads wait for one load instead of
+    # each loading their own copy
+    with model_lock:
+        if key not in _models:
+            if kind not in _loaders:
+                raise KeyError(f"No loader registered for model kind '{kind}'")
+            logger.info("Loading %s model %s...", kind, name)
+            rss_before = current_rss_mb()
+            start = time.perf_counter()
+            _models[key] = _loaders[kind](name)
+            load_time = time.perf_counter() - start
+            _model_stats[f"{kind}:{name}"] = {
+                "kind": kind,
+                "name": name,
+                "load_time_sec": load_time,
+                "rss_delta_mb": current_rss_mb() - rss_before,
+                "parameter_mb": _parameter_mb(_models[key]),
+                "loaded_at": time.time(),
+            }
+            logger.info("Loaded %s model %s in %.2f sec", kind, name, load_time)
+    return _models[key]
+
+
+def inference_lock(kind, name):
+    """
+    Lock to hold around calls into a shared model that are not thread-safe. Whisper's
+    decoder and word-timestamp alignment install forward hooks on the model's modules,
+    so two threads transcribing with one instance at once corrupt each other's output.
+    """
+    with _registry_lock:
+        return _inference_locks.setdefault((kind, name), Lock())
+
+
+def is_loaded(kind, name):
+    return (kind, name) in _models
+
+
+def model_stats():
+    """Per-model load time and memory metrics."""
+    return {
+        "models": dict(_model_stats),
+        "process_rss_mb": current_rss_mb(),
+    }
+
+
+def parse_model_specs(specs):
+    """Parse "whisper:base,emotion:<hf name>" into [(kind, name), ...]."""
+    parsed = []
+    for spec in specs.split(","):
+        spec = spec.strip()
+        if not spec:
+            continue
+        kind, _, name = spec.partition(":")
+        parsed.append((kind.strip(), name.strip()))
+    return parsed
+
+
+def warm_up(model_specs, background=True):
+    """Load the given (kind, name) models ahead of the first request."""
+    def _load_all():
+        for kind, name in model_specs:
+            try:
+                get_model(kind, name)
+            except Exception as e:
+                logger.error("Warm-up failed for %s:%s: %s", kind, name, e)
+
+    if background:
+        thread = Thread(target=_load_all, daemon=True)
+        thread.start()
+        return thread
+    _load_all()
+    return None
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import logging
+from bisect import bisect_left
+from threading import Lock
+
+# Metrics in the Prometheus text format and leveled logging for the backend. Metrics are
+# plain in-process objects (no client library); the server renders them at /metrics.
+# Pipeline spans recorded in process-pool workers are forwarded to the server process.
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """A value that is set directly, or read from a callback when metrics are rendered."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        # callback returns {label values tuple: value}, or a number for an unlabelled gauge
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        values = self._values
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                logging.getLogger(__name__).warning("Gauge %s callback failed: %s", self.name, e)
+                return []
+            if not isinstance(values, dict):
+                values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0}
+            state["counts"][bisect_left(self.buckets, value)] += 1
+            state["sum"] += value
+
+    def _samples(self):
+        lines = []
+        for key, state in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state["counts"]):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [("le", _format_value(bound) if bound != float("inf") else "+Inf")])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Pipeline spans, recorded for every stage and model call
+PIPELINE_SPAN_SECONDS = REGISTRY.register(Histogram(
+    "pipeline_span_seconds", "Wall time of pipeline stages and model calls", ["span"]))
+PIPELINE_SPAN_CPU_SECONDS = REGISTRY.register(Counter(
+    "pipeline_span_cpu_seconds_total", "Process CPU time spent in pipeline stages and model calls", ["span"]))
+
+# Set in process-pool workers: sends (name, wall_sec, cpu_sec) to the server process
+_span_forwarder = None
+
+
+def set_span_forwarder(forwarder):
+    global _span_forwarder
+    _span_forwarder = forwarder
+
+
+def observe_span(name, wall_sec, cpu_sec):
+    """Record one span here, or forward it to the server when running in a worker process."""
+    if _span_forwarder is not None:
+        _span_forwarder(name, wall_sec, cpu_sec)
+        return
+    PIPELINE_SPAN_SECONDS.observe(wall_sec, span=name)
+    PIPELINE_SPAN_CPU_SECONDS.inc(cpu_sec, span=name)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields passed to the logger are included."""
+
+    RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record):
+        entry = {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in self.RESERVED)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level=None, fmt=None):
+    """Set up the root logger from LOG_LEVEL (default INFO) and LOG_FORMAT ("text" or "json")."""
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.environ.get("LOG_FORMAT", "text")
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
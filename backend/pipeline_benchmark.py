@@ -0,0 +1,175 @@
+"""
+Benchmark the analysis pipeline stage by stage on the bundled sample audio.
+
+Runs each input through the pipeline (models are loaded beforehand, so stages are timed
+warm) and reports wall time, CPU time and peak RSS for every stage: load, vad, transcribe,
+segment, emotion, filler, pacing_volume and summarize. Synthetic long inputs are built by
+concatenating the samples. The report is JSON; given --baseline, stage wall times are
+compared against a stored report and the exit status is 1 on a regression.
+
+    python pipeline_benchmark.py --long 600 1800 --output bench.json
+    python pipeline_benchmark.py --baseline bench.json --tolerance 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from threading import Thread, Event
+
+import numpy as np
+import torch
+from scipy.io import wavfile
+
+from ai_scripts import (PIPELINE_STAGES, PIPELINE_VERSION, INFERENCE_PRECISION, default_model_specs,
+                        load_audio_16k, new_pipeline_job)
+from model_registry import current_rss_mb, model_stats, warm_up
+
+SAMPLE_FILES = ["kimmi1.wav", "kimmi3.wav", "sample.mp3"]
+STAGE_NAMES = ["load", "vad", "transcribe", "segment", "emotion", "filler", "pacing_volume", "summarize"]
+
+
+class RssSampler:
+    """Samples this process's RSS in the background so each span's peak can be looked up."""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.samples = []
+        self._stop = Event()
+        self._thread = Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.samples.append((time.perf_counter(), current_rss_mb()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def peak(self, start, end):
+        inside = [rss for t, rss in self.samples if start <= t <= end]
+        # Spans shorter than the interval fall between samples; use the nearest one
+        if not inside and self.samples:
+            inside = [min(self.samples, key=lambda sample: abs(sample[0] - end))[1]]
+        return max(inside, default=current_rss_mb())
+
+
+def build_long_input(files, duration, output_dir):
+    """Concatenate the sample files (decoded at 16 kHz) until they reach `duration` seconds."""
+    pieces = [load_audio_16k(input_file)[1] for input_file in files]
+    rate = 16000
+    audio = np.concatenate(pieces)
+    repeats = int(np.ceil(duration * rate / len(audio)))
+    audio = np.tile(audio, repeats)[:int(duration * rate)]
+    path = os.path.join(output_dir, f"synthetic_{int(duration)}s.wav")
+    wavfile.write(path, rate, (np.clip(audio, -1, 1) * 32767).astype(np.int16))
+    return path
+
+
+def run_one(input_file, output_dir, model_name, streaming, sampler):
+    job = new_pipeline_job(input_file, output_dir, model_name=model_name, streaming=streaming)
+    start = time.perf_counter()
+    for _, stage in PIPELINE_STAGES:
+        job = stage(job)
+    total = time.perf_counter() - start
+
+    stages = {}
+    for span in job["timings"]:
+        stage = stages.setdefault(span["name"], {"wall_sec": 0.0, "cpu_sec": 0.0, "peak_rss_mb": 0.0})
+        stage["wall_sec"] += span["wall_sec"]
+        stage["cpu_sec"] += span["cpu_sec"]
+        stage["peak_rss_mb"] = max(stage["peak_rss_mb"], sampler.peak(span["start"], span["end"]))
+    return {
+        "input": os.path.basename(input_file),
+        "duration_sec": job["duration"],
+        "segments": len(job["transcription"]["segments"]),
+        "total_wall_sec": total,
+        "realtime_factor": total / job["duration"] if job["duration"] else None,
+        "stages": {name: stages[name] for name in STAGE_NAMES if name in stages},
+    }
+
+
+def compare(report, baseline, tolerance, min_delta_sec):
+    """Stage wall times that got slower than the baseline by more than the tolerance."""
+    baseline_runs = {run["input"]: run for run in baseline["runs"]}
+    regressions = []
+    for run in report["runs"]:
+        previous = baseline_runs.get(run["input"])
+        if previous is None:
+            continue
+        for name, stage in run["stages"].items():
+            before = previous["stages"].get(name)
+            if before is None:
+                continue
+            delta = stage["wall_sec"] - before["wall_sec"]
+            if delta > min_delta_sec and stage["wall_sec"] > before["wall_sec"] * (1 + tolerance):
+                regressions.append({
+                    "input": run["input"],
+                    "stage": name,
+                    "baseline_wall_sec": before["wall_sec"],
+                    "wall_sec": stage["wall_sec"],
+                    "ratio": stage["wall_sec"] / before["wall_sec"] if before["wall_sec"] else None,
+                })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", default=SAMPLE_FILES)
+    parser.add_argument("--long", type=float, nargs="*", default=[600], help="Durations (sec) of synthetic inputs")
+    parser.add_argument("--model", default="base", help="Whisper model")
+    parser.add_argument("--streaming", action="store_true", help="Use windowed transcription (stages overlap)")
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown per stage (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.05, help="Ignore slowdowns under this many seconds")
+    args = parser.parse_args()
+
+    # Load every model up front so stage times don't include it
+    warm_up(default_model_specs(args.model), background=False)
+
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "torch_threads": torch.get_num_threads(),
+            "cuda": torch.cuda.is_available(),
+            "whisper_model": args.model,
+            "inference_precision": INFERENCE_PRECISION,
+            "pipeline_version": PIPELINE_VERSION,
+        },
+        "model_load": model_stats()["models"],
+        "runs": [],
+    }
+
+    with tempfile.TemporaryDirectory() as output_dir, RssSampler() as sampler:
+        inputs = list(args.files) + [build_long_input(args.files, duration, output_dir) for duration in args.long]
+        for input_file in inputs:
+            report["runs"].append(run_one(input_file, output_dir, args.model, args.streaming, sampler))
+
+    # ru_maxrss is in KB on Linux
+    report["process_peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.tolerance, args.min_delta)
+        status = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+    sys.exit(status)
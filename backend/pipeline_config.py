@@ -0,0 +1,54 @@
+import os
+
+# Pipeline settings shared by the API server and the analysis code. Kept free of heavy
+# imports so the server can read them without loading the ML stack.
+
+# Bump whenever a change alters the analysis output, so cached results are not reused
+PIPELINE_VERSION = "11"
+
+# Models used by the pipeline
+EMOTION_MODEL_NAME = "ehcalabres/wav2vec2-lg-xlsr-en-speech-emotion-recognition"
+SUMMARY_MODEL_NAME = "HuggingFaceTB/SmolLM2-360M-Instruct"
+
+# Pipeline stages in order (see ai_scripts.PIPELINE_STAGES); named here so STAGE_CONCURRENCY
+# can be checked without importing the ML stack
+PIPELINE_STAGE_NAMES = ("transcribe", "analyze", "summarize")
+
+# Recordings at least this long (seconds) are transcribed in windows and analyzed as segments arrive
+STREAMING_MIN_DURATION = 300
+
+# Energy-based voice activity detection before transcription: only speech regions are sent
+# to Whisper (and so become segments for the emotion model); set VAD_ENABLED=0 to send everything
+VAD_ENABLED = os.environ.get("VAD_ENABLED", "1") != "0"
+
+# Precision of the emotion and summary models: "fp32", "int8" (dynamic quantization of the
+# Linear layers, CPU only) or "bf16". Read from the environment here rather than in server.py
+# so process-pool workers load their models the same way.
+INFERENCE_PRECISIONS = ("fp32", "int8", "bf16")
+INFERENCE_PRECISION = os.environ.get("INFERENCE_PRECISION", "fp32")
+
+# Summary generation budget: only new tokens count, the prompt is not included
+SUMMARY_MAX_NEW_TOKENS = int(os.environ.get("SUMMARY_MAX_NEW_TOKENS", "160"))
+# Optional smaller model sharing the summary model's tokenizer, used as the draft for
+# speculative (assisted) decoding; greedy decoding when unset
+SUMMARY_DRAFT_MODEL_NAME = os.environ.get("SUMMARY_DRAFT_MODEL_NAME") or None
+# Transcripts longer than this many tokens are summarized map-reduce style: chunks of
+# segments first, then the chunk summaries together with the aggregated metrics
+SUMMARY_CHUNK_TOKENS = int(os.environ.get("SUMMARY_CHUNK_TOKENS", "1500"))
+SUMMARY_CHUNK_NEW_TOKENS = int(os.environ.get("SUMMARY_CHUNK_NEW_TOKENS", "96"))
+
+
+def output_settings():
+    """Every environment setting above that changes the analysis output, as one string for cache keys."""
+    return "|".join(str(value) for value in (
+        PIPELINE_VERSION, INFERENCE_PRECISION, int(VAD_ENABLED), SUMMARY_MAX_NEW_TOKENS,
+        SUMMARY_DRAFT_MODEL_NAME or "", SUMMARY_CHUNK_TOKENS, SUMMARY_CHUNK_NEW_TOKENS,
+    ))
+
+
+def default_model_specs(whisper_model="base"):
+    """(kind, name) pairs for every model the pipeline uses."""
+    specs = [("whisper", whisper_model), ("emotion", EMOTION_MODEL_NAME), ("llm", SUMMARY_MODEL_NAME)]
+    if SUMMARY_DRAFT_MODEL_NAME:
+        specs.append(("llm", SUMMARY_DRAFT_MODEL_NAME))
+    return specs
@@ -0,0 +1,69 @@
+"""
+Sustained-load throughput test for the staged pipeline.
+
+Keeps `--in-flight` jobs submitted for `--duration` seconds, cycling through the input
+files, and prints per-stage stats and jobs/minute as JSON. Run with --sequential to get
+the one-job-at-a-time baseline for comparison.
+
+    python pipeline_load_test.py kimmi1.wav kimmi3.wav sample.mp3 --duration 600 --in-flight 3
+"""
+import argparse
+import itertools
+import json
+import tempfile
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from ai_scripts import PIPELINE_STAGES, new_pipeline_job, preprocess_audio_pipeline
+from execution import parse_stage_concurrency
+from staged_pipeline import StagedPipeline
+
+
+def run_sequential(files, duration, output_dir):
+    completed = 0
+    start = time.time()
+    for input_file in itertools.cycle(files):
+        if time.time() - start >= duration:
+            break
+        preprocess_audio_pipeline(input_file, output_dir, prompt=None)
+        completed += 1
+    elapsed = time.time() - start
+    return {"mode": "sequential", "completed": completed, "elapsed_sec": elapsed,
+            "throughput_jobs_per_min": completed * 60 / elapsed}
+
+
+def run_staged(files, duration, in_flight, concurrency, output_dir):
+    engine = StagedPipeline(PIPELINE_STAGES, concurrency)
+    inputs = itertools.cycle(files)
+    pending = set()
+    start = time.time()
+    while time.time() - start < duration:
+        while len(pending) < in_flight:
+            pending.add(engine.submit(new_pipeline_job(next(inputs), output_dir)))
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            future.result()
+    wait(pending)
+    elapsed = time.time() - start
+    stats = engine.stats()
+    engine.shutdown()
+    return {"mode": "staged", "in_flight": in_flight, "elapsed_sec": elapsed,
+            "throughput_jobs_per_min": stats["completed"] * 60 / elapsed, **stats}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--duration", type=float, default=300, help="Seconds of sustained load")
+    parser.add_argument("--in-flight", type=int, default=3, help="Jobs kept submitted at once")
+    parser.add_argument("--stage-concurrency", default="transcribe=1,analyze=1,summarize=1")
+    parser.add_argument("--sequential", action="store_true", help="Run jobs one at a time instead")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        if args.sequential:
+            report = run_sequential(args.files, args.duration, output_dir)
+        else:
+            report = run_staged(args.files, args.duration, args.in_flight,
+                                parse_stage_concurrency(args.stage_concurrency), output_dir)
+    print(json.dumps(report, indent=4))
@@ -0,0 +1,117 @@
+"""
+Accuracy/latency benchmark of the emotion and summary models at each inference precision.
+
+The bundled audio is cut into fixed windows and classified at fp32 and at every other
+precision; the report gives load time, memory, latency and agreement with fp32 (same top
+emotion, mean absolute probability difference). With --summary, the summary model also
+greedily continues a prompt built from the sample transcription and the generated tokens
+are compared with fp32's.
+
+    python precision_benchmark.py kimmi1.wav kimmi3.wav sample.mp3 --precisions fp32 int8 bf16
+"""
+import argparse
+import json
+import time
+
+import torch
+
+from ai_scripts import (EMOTION_MODEL_NAME, SUMMARY_MODEL_NAME, analyze_emotions_batched, load_audio_16k,
+                        load_emotion_model, load_local_model, resolve_precision)
+from model_registry import current_rss_mb, _parameter_mb
+from sample_transcription import bernie
+
+
+def audio_windows(files, window_sec):
+    windows = []
+    for input_file in files:
+        rate, data, _ = load_audio_16k(input_file)
+        step = int(window_sec * rate)
+        windows.extend(data[i:i + step] for i in range(0, len(data) - step // 2, step))
+    return windows
+
+
+def timed_load(loader, name, precision):
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    loaded = loader(name, precision=precision)
+    return loaded, {
+        "load_time_sec": time.perf_counter() - start,
+        "rss_delta_mb": current_rss_mb() - rss_before,
+        "parameter_mb": _parameter_mb(loaded),
+    }
+
+
+def bench_emotion(windows, precision, batch_size):
+    (model, feature_extractor), report = timed_load(load_emotion_model, EMOTION_MODEL_NAME, precision)
+    start = time.perf_counter()
+    results = analyze_emotions_batched(windows, model, feature_extractor, batch_size=batch_size)
+    report["latency_sec"] = time.perf_counter() - start
+    report["latency_per_window_ms"] = report["latency_sec"] * 1000 / len(windows)
+    del model
+    return results, report
+
+
+def bench_summary(precision, max_new_tokens):
+    (model, tokenizer), report = timed_load(load_local_model, SUMMARY_MODEL_NAME, precision)
+    prompt = f"Give concise feedback on the delivery of this speech:\n{bernie['text'][:2000]}\n\nFeedback:"
+    inputs = tokenizer(prompt, return_tensors="pt").to(next(model.parameters()).device)
+    start = time.perf_counter()
+    with torch.no_grad():
+        outputs = model.generate(**inputs, max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens, do_sample=False)
+    elapsed = time.perf_counter() - start
+    tokens = outputs[0, inputs["input_ids"].shape[1]:].tolist()
+    report.update(latency_sec=elapsed, tokens_per_sec=len(tokens) / elapsed)
+    del model
+    return tokens, report
+
+
+def token_agreement(tokens, reference):
+    """Fraction of reference tokens reproduced before the first divergence."""
+    matched = 0
+    for token, expected in zip(tokens, reference):
+        if token != expected:
+            break
+        matched += 1
+    return matched / len(reference) if reference else 1.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", default=["kimmi1.wav", "kimmi3.wav", "sample.mp3"])
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "int8", "bf16"])
+    parser.add_argument("--window-sec", type=float, default=5.0, help="Length of the classified audio windows")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--summary", action="store_true", help="Also benchmark the summary model")
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    args = parser.parse_args()
+
+    # fp32 first: it's the reference the others are compared against
+    precisions = ["fp32"] + [resolve_precision(p) for p in args.precisions if p != "fp32"]
+    precisions = list(dict.fromkeys(precisions))
+    windows = audio_windows(args.files, args.window_sec)
+
+    report = {"windows": len(windows), "window_sec": args.window_sec, "emotion": {}, "summary": {}}
+    reference = None
+    for precision in precisions:
+        results, stats = bench_emotion(windows, precision, args.batch_size)
+        if reference is None:
+            reference = results
+        stats["top_emotion_agreement"] = sum(
+            r["predicted_emotion"] == f["predicted_emotion"] for r, f in zip(results, reference)) / len(windows)
+        stats["mean_abs_probability_diff"] = sum(
+            abs(a - b) for r, f in zip(results, reference)
+            for a, b in zip(r["confidence_scores"], f["confidence_scores"])) / (len(windows) * len(reference[0]["confidence_scores"]))
+        stats["speedup_vs_fp32"] = report["emotion"]["fp32"]["latency_sec"] / stats["latency_sec"] if report["emotion"] else 1.0
+        report["emotion"][precision] = stats
+
+    if args.summary:
+        reference_tokens = None
+        for precision in precisions:
+            tokens, stats = bench_summary(precision, args.max_new_tokens)
+            if reference_tokens is None:
+                reference_tokens = tokens
+            stats["token_agreement"] = token_agreement(tokens, reference_tokens)
+            stats["speedup_vs_fp32"] = report["summary"]["fp32"]["latency_sec"] / stats["latency_sec"] if report["summary"] else 1.0
+            report["summary"][precision] = stats
+
+    print(json.dumps(report, indent=4))
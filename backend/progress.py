@@ -0,0 +1,58 @@
+import asyncio
+import time
+from threading import Lock
+
+# Terminal stages: once published, the task's event history is dropped
+FINAL_STAGES = ("completed", "failed")
+
+
+class ProgressBroker:
+    """
+    Fan-out of pipeline progress events from worker threads to async subscribers.
+    Events of running tasks are kept so late subscribers are replayed what they missed.
+    """
+
+    def __init__(self):
+        self._history = {}
+        self._subscribers = {}
+        self._lock = Lock()
+
+    def open(self, task_id):
+        """Start recording events for a task."""
+        with self._lock:
+            self._history.setdefault(task_id, [])
+
+    def close(self, task_id):
+        """Drop a task's event history without publishing a final event (deleted, or finished elsewhere)."""
+        with self._lock:
+            self._history.pop(task_id, None)
+
+    def publish(self, task_id, event):
+        """Record an event for a task and push it to every subscriber; safe to call from any thread."""
+        event = dict(event, task_id=task_id, time=time.time())
+        with self._lock:
+            if event["stage"] in FINAL_STAGES:
+                self._history.pop(task_id, None)
+            elif task_id in self._history:
+                # Stragglers arriving after a final event are not recorded
+                self._history[task_id].append(event)
+            subscribers = list(self._subscribers.get(task_id, []))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    def subscribe(self, task_id):
+        """Register the calling event loop; returns (queue, events published so far)."""
+        queue = asyncio.Queue()
+        subscriber = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(task_id, []).append(subscriber)
+            history = list(self._history.get(task_id, []))
+        return subscriber, history
+
+    def unsubscribe(self, task_id, subscriber):
+        with self._lock:
+            subscribers = self._subscribers.get(task_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(task_id, None)
@@ -0,0 +1,103 @@
+import os
+import json
+import logging
+import hashlib
+import tempfile
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# Persistent cache of analysis results keyed on the uploaded audio's content hash plus
+# everything that changes the pipeline output. One JSON file per entry; the file's
+# mtime is its last use, which drives LRU eviction once the cache exceeds max_bytes.
+# Several processes may share the directory, so any file can vanish between calls.
+
+
+class ResultCache:
+    def __init__(self, cache_dir="cache", max_bytes=500 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash, model_name, prompt, pipeline_version):
+        """Cache key for one upload analyzed with a given Whisper model, prompt and pipeline version."""
+        parts = [content_hash, model_name, prompt or "", str(pipeline_version)]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the cached results for key, or None on a miss."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    results = json.load(f)
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError):
+                self._remove(path)  # Corrupt entry, treat as a miss
+                return None
+            try:
+                os.utime(path)  # Mark as recently used
+            except FileNotFoundError:
+                pass  # Evicted by another process in the meantime
+        return results
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, key, results):
+        """Store results under key, then evict least recently used entries over the size limit."""
+        path = self._path(key)
+        with self._lock:
+            # A unique temporary name, so concurrent writers of one key don't collide
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(results, f, ensure_ascii=False)
+                os.replace(tmp_path, path)
+            except BaseException:
+                self._remove(tmp_path)
+                raise
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+        entries.sort()  # Oldest use first
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(os.path.join(self.cache_dir, name)):
+                logger.info("Evicted cached result %s", name)
+            total -= size
+
+    def stats(self):
+        sizes = []
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    sizes.append(os.path.getsize(os.path.join(self.cache_dir, name)))
+                except FileNotFoundError:
+                    continue
+        return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": self.max_bytes}
@@ -0,0 +1,102 @@
+import json
+import zlib
+
+# Compact storage format for analysis results. Results are split into sections that are
+# stored and loaded independently, so a client that only renders the summary never
+# decodes the segments. Segments are stored column-wise (one list per field instead of a
+# dict per segment) as zlib-compressed JSON, without Whisper's token ids.
+
+FORMAT_VERSION = 1
+SECTIONS = ("summary", "segments", "word_metrics", "loudness_envelope")
+
+# Whisper decoding details no client uses
+DROPPED_SEGMENT_FIELDS = ("tokens",)
+
+
+def parse_fields(spec):
+    """Parse a fields= selector ("summary,segments", "full" or empty) into a tuple of sections."""
+    if not spec or spec == "full":
+        return SECTIONS
+    fields = tuple(dict.fromkeys(field.strip() for field in spec.split(",") if field.strip()))
+    unknown = [field for field in fields if field not in SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}, expected any of {list(SECTIONS)} or 'full'")
+    return fields
+
+
+def segment_columns(segments):
+    """Segments as {field: [value per segment]}; nested dicts become "parent.child" columns."""
+    columns = {}
+    for index, segment in enumerate(segments):
+        for key, value in segment.items():
+            if key in DROPPED_SEGMENT_FIELDS:
+                continue
+            items = [(f"{key}.{sub}", sub_value) for sub, sub_value in value.items()] if isinstance(value, dict) else [(key, value)]
+            for column, column_value in items:
+                # A field first seen on a later segment is missing (None) on the earlier ones
+                columns.setdefault(column, [None] * index).append(column_value)
+        for values in columns.values():
+            if len(values) == index:
+                values.append(None)
+    return {"count": len(segments), "columns": columns}
+
+
+def segment_rows(packed):
+    """Rebuild the list of segment dicts from segment_columns output."""
+    rows = [{} for _ in range(packed["count"])]
+    for column, values in packed["columns"].items():
+        key, _, sub = column.partition(".")
+        for row, value in zip(rows, values):
+            if sub:
+                row.setdefault(key, {})[sub] = value
+            else:
+                row[key] = value
+    return rows
+
+
+def pack_results(results):
+    """Split results into {section: compressed bytes}."""
+    sections = {
+        "summary": {key: value for key, value in results.items() if key not in SECTIONS},
+        "segments": segment_columns(results.get("segments") or []),
+    }
+    for section in ("word_metrics", "loudness_envelope"):
+        if section in results:
+            sections[section] = results[section]
+    return {
+        section: zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        for section, value in sections.items()
+    }
+
+
+def unpack_results(packed_sections, fields=SECTIONS):
+    """Results view with only the requested sections, from {section: compressed bytes}."""
+    results = {}
+    for section in fields:
+        data = packed_sections.get(section)
+        if data is None:
+            continue
+        value = json.loads(zlib.decompress(data).decode("utf-8"))
+        if section == "summary":
+            results.update(value)
+        elif section == "segments":
+            results["segments"] = segment_rows(value)
+        else:
+            results[section] = value
+    return results
+
+
+def select_fields(results, fields=SECTIONS):
+    """The same view as unpack_results, taken from a full results dict."""
+    view = {}
+    if "summary" in fields:
+        view.update((key, value) for key, value in results.items() if key not in SECTIONS)
+    for section in fields:
+        if section == "segments" and "segments" in results:
+            view["segments"] = [
+                {key: value for key, value in segment.items() if key not in DROPPED_SEGMENT_FIELDS}
+                for segment in results["segments"]
+            ]
+        elif section != "summary" and section in results:
+            view[section] = results[section]
+    return view
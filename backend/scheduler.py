@@ -0,0 +1,99 @@
+import logging
+from collections import OrderedDict
+from threading import Thread, Lock, Condition
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobScheduler:
+    """Fixed pool of worker threads consuming a bounded FIFO queue of jobs."""
+
+    # Jobs run once; a handler that raises is only logged
+    retries = False
+
+    def __init__(self, worker_count=1, max_queue=16):
+        self.worker_count = worker_count
+        self.max_queue = max_queue
+        self._pending = OrderedDict()  # job_id -> (fn, args), in FIFO order
+        self._running = set()
+        self._lock = Lock()
+        self._not_empty = Condition(self._lock)
+        self._accepting = True
+        self._workers = []
+        for i in range(worker_count):
+            worker = Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def start(self):
+        """Workers start with the scheduler; here for parity with DistributedScheduler."""
+
+    def submit(self, job_id, fn, *args):
+        """Queue fn(*args); raises QueueFull if the queue is at capacity."""
+        with self._lock:
+            if not self._accepting:
+                raise QueueFull("Scheduler is shutting down")
+            if len(self._pending) >= self.max_queue:
+                raise QueueFull(f"Job queue is full ({self.max_queue} jobs waiting)")
+            self._pending[job_id] = (fn, args)
+            self._not_empty.notify()
+
+    def is_full(self):
+        with self._lock:
+            return len(self._pending) >= self.max_queue
+
+    def queue_position(self, job_id):
+        """1-based position of a waiting job, 0 if it is running, None if unknown."""
+        with self._lock:
+            if job_id in self._running:
+                return 0
+            for position, pending_id in enumerate(self._pending, start=1):
+                if pending_id == job_id:
+                    return position
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.worker_count,
+                "max_queue": self.max_queue,
+                "queued": len(self._pending),
+                "running": len(self._running),
+            }
+
+    def _worker_loop(self):
+        while True:
+            with self._lock:
+                while not self._pending and self._accepting:
+                    self._not_empty.wait()
+                if not self._pending:
+                    return  # Shut down and nothing left to run
+                job_id, (fn, args) = self._pending.popitem(last=False)
+                self._running.add(job_id)
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.exception("Unhandled error in job %s", job_id)
+            finally:
+                with self._lock:
+                    self._running.discard(job_id)
+
+    def shutdown(self, cancel_pending=True, timeout=None):
+        """
+        Stop accepting jobs and wait for the workers to finish.
+        With cancel_pending, jobs that have not started are dropped and their ids returned
+        so the caller can resume them later; otherwise the whole queue is drained first.
+        """
+        with self._lock:
+            self._accepting = False
+            cancelled = list(self._pending) if cancel_pending else []
+            if cancel_pending:
+                self._pending.clear()
+            self._not_empty.notify_all()
+        for worker in self._workers:
+            worker.join(timeout)
+        return cancelled
@@ -1,19 +1,54 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+import time
+# Measured from here to the end of the module, reported by /ready
+_import_started = time.perf_counter()
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response
 from uuid import uuid4
 import os
-import json
 from datetime import datetime
-from threading import Thread, Lock
 import shutil
-from fastapi.responses import FileResponse
-from ai_scripts import preprocess_audio_pipeline
+from fastapi.responses import StreamingResponse
+from pipeline_config import default_model_specs, output_settings
+from model_registry import warm_up, parse_model_specs, model_stats
+from scheduler import JobScheduler, QueueFull
+from job_queue import DistributedScheduler, create_job_queue, register_job_handler, register_dead_letter_handler
+from execution import create_backend, parse_stage_concurrency, WorkerCrashed
+from result_cache import ResultCache
+from task_store import TaskStore, SharedTaskStore, InvalidCursor
+from ingest import ingest_upload, normalized_path_for, IngestError
+from starlette.concurrency import run_in_threadpool
+from progress import ProgressBroker, FINAL_STAGES
+from results_format import parse_fields
+from media import (media_type_for, rendition_path_for, encode_rendition, parse_range, iter_file_range,
+                   cut_clip, InvalidRange, RENDITION_MEDIA_TYPE)
+from observability import REGISTRY, Counter, Gauge, Histogram, configure_logging
+from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import json
+import hashlib
+import sqlite3
+import importlib
+import logging
 from fastapi.middleware.cors import CORSMiddleware
-import time
-import atexit
+
+# Leveled logging, configured from LOG_LEVEL and LOG_FORMAT ("text" or "json")
+configure_logging()
+logger = logging.getLogger("server")
 
 # FastAPI app instance
 app = FastAPI()
 
+# Registered before CORS so CORS wraps it and its 413s carry the CORS headers
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Answer 413 before the body is read when Content-Length is already over the limit."""
+    if request.url.path == "/upload":
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES:
+            return Response(status_code=413, media_type="application/json",
+                            content=json.dumps({"detail": f"Upload exceeds the {MAX_UPLOAD_BYTES // (1024 * 1024)} MB limit"}))
+    return await call_next(request)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -24,135 +59,382 @@ app.add_middleware(
 )
 
 
-# Persistent task storage file
-TASKS_FILE = "tasks.json"
-tasks = {}
-lock = Lock()  # Lock for thread-safe updates to tasks
+# Where analyses run. "local" keeps the queue in this process. "sqlite" (a JOB_QUEUE_DB
+# file) or "redis" (at REDIS_URL) share one queue between processes, so several API
+# replicas and separate inference workers can run side by side: SERVER_ROLE "api" only
+# enqueues, "worker" (see worker.py) only runs jobs, "all" does both. Workers hold a
+# lease on each job and renew it while running; if they die, the job is run again
+# elsewhere. Replicas must share the working directory (uploads/, tasks.db, cache/),
+# so they all run on one host: tasks.db and jobs.db use SQLite's WAL mode, whose
+# shared-memory index does not work over a network filesystem. Redis moves the queue
+# off the host, but task state and uploads stay local.
+JOB_QUEUE = os.environ.get("JOB_QUEUE", "local")
+JOB_QUEUE_DB = os.environ.get("JOB_QUEUE_DB", "jobs.db")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+JOB_LEASE_SEC = float(os.environ.get("JOB_LEASE_SEC", "60"))
+SERVER_ROLE = os.environ.get("SERVER_ROLE", "all")
+if SERVER_ROLE not in ("all", "api", "worker"):
+    raise ValueError(f"SERVER_ROLE must be 'all', 'api' or 'worker', got '{SERVER_ROLE}'")
+if JOB_QUEUE == "local" and SERVER_ROLE != "all":
+    raise ValueError("SERVER_ROLE api/worker needs a shared JOB_QUEUE (sqlite or redis)")
 
-# Load tasks from the JSON file on startup
+# Persistent task storage: every change is written through to SQLite as it happens,
+# and results are stored apart from task metadata and loaded only when fetched.
+# With a shared queue, other processes write tasks too, so nothing is cached in memory.
+TASKS_DB = "tasks.db"
+LEGACY_TASKS_FILE = "tasks.json"  # Imported once into TASKS_DB if present
+tasks = TaskStore(TASKS_DB) if JOB_QUEUE == "local" else SharedTaskStore(TASKS_DB)
+
+# Load task metadata on startup
 def load_tasks():
-    print('loading tasks')
-    global tasks
-    if os.path.exists(TASKS_FILE):
-        with open(TASKS_FILE, "r", encoding="utf-8") as f:
-            tasks = json.load(f)
-    else:
-        tasks = {}
+    logger.info("Loading tasks")
+    tasks.open(legacy_json_file=LEGACY_TASKS_FILE)
+
+# Models to load at startup: "all", "" (lazy, on first upload) or e.g. "whisper:base,emotion:<name>"
+WARMUP_MODELS = os.environ.get("WARMUP_MODELS", "all")
+
+def warmup_model_specs():
+    if WARMUP_MODELS == "all":
+        return default_model_specs("base")
+    return parse_model_specs(WARMUP_MODELS)
+
+# The ML stack is imported off the startup path, heaviest dependencies first so each
+# one's own cost is measured
+INFERENCE_MODULES = ("numpy", "torch", "transformers", "librosa", "whisper", "ai_scripts")
+
+# Readiness of the inference backend, reported by /ready
+inference_state = {"status": "starting", "error": None, "import_sec": {}, "warm_up_sec": None, "ready_at": None}
 
-# Save tasks to the JSON file
-def save_tasks():
-    if tasks is None:
+def import_inference_stack():
+    for name in INFERENCE_MODULES:
+        start = time.perf_counter()
+        importlib.import_module(name)
+        inference_state["import_sec"][name] = time.perf_counter() - start
+    logger.info("Imported inference stack: %s",
+                ", ".join(f"{name} {sec:.2f}s" for name, sec in inference_state["import_sec"].items()))
+
+def warm_up_models():
+    """Import the ML stack and load the models; runs in a background thread at startup."""
+    start = time.perf_counter()
+    try:
+        if execution_backend.name != "process":
+            # Worker processes import the stack themselves
+            import_inference_stack()
+        execution_backend.start()
+        if execution_backend.name == "process":
+            # Each worker process warms its own models
+            execution_backend.wait_ready()
+        else:
+            specs = warmup_model_specs()
+            if specs:
+                logger.info("Warming up models: %s", specs)
+                warm_up(specs, background=False)
+    except Exception as e:
+        logger.exception("Inference backend failed to start")
+        inference_state.update(status="failed", error=str(e))
         return
-    with lock:  # Ensure thread-safe write
-        with open(TASKS_FILE, "w", encoding="utf-8") as f:
-            json.dump(tasks, f, ensure_ascii=False, indent=4)
+    inference_state.update(status="ready", warm_up_sec=time.perf_counter() - start, ready_at=datetime.now().isoformat())
+    logger.info("Inference backend ready after %.2f sec", inference_state["warm_up_sec"])
+
+# "thread" runs the pipeline on the scheduler threads; "process" runs it in WORKER_COUNT
+# long-lived worker processes so CPU-bound analysis doesn't hold the API's GIL; "staged"
+# gives transcribe/analyze/summarize their own workers (STAGE_CONCURRENCY) so jobs overlap
+EXECUTION_BACKEND = os.environ.get("EXECUTION_BACKEND", "thread")
+STAGE_CONCURRENCY = parse_stage_concurrency(os.environ.get("STAGE_CONCURRENCY", "transcribe=1,analyze=1,summarize=1"))
+
+# Bounded pool of analysis workers; uploads beyond MAX_QUEUED_JOBS get a 429.
+# In staged mode each scheduler worker holds one job in flight, so there is one per stage worker.
+WORKER_COUNT = int(os.environ.get("WORKER_COUNT", "1"))
+if EXECUTION_BACKEND == "staged" and sum(STAGE_CONCURRENCY.values()) > WORKER_COUNT:
+    logger.warning("Staged backend: WORKER_COUNT raised from %d to %d, one per stage worker (STAGE_CONCURRENCY)",
+                   WORKER_COUNT, sum(STAGE_CONCURRENCY.values()))
+    WORKER_COUNT = sum(STAGE_CONCURRENCY.values())
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", "16"))
+if JOB_QUEUE == "local":
+    scheduler = JobScheduler(worker_count=WORKER_COUNT, max_queue=MAX_QUEUED_JOBS)
+else:
+    scheduler = DistributedScheduler(
+        create_job_queue(JOB_QUEUE, path=JOB_QUEUE_DB, url=REDIS_URL),
+        worker_count=0 if SERVER_ROLE == "api" else WORKER_COUNT,
+        max_queue=MAX_QUEUED_JOBS,
+        lease_sec=JOB_LEASE_SEC,
+    )
+
+execution_backend = create_backend(EXECUTION_BACKEND, WORKER_COUNT, warmup_model_specs(), STAGE_CONCURRENCY)
 
-# Periodically save tasks to ensure persistence
-def periodic_save_tasks(interval=10):
-    while True:
-        time.sleep(interval)
-        save_tasks()
+# Transcription settings; both are part of the result cache key
+WHISPER_MODEL = "base"
+FILLER_PROMPT = "uh, um, ah, like, you know, well, hmm, uh-huh, okay..."
 
-# Start periodic save in a background thread
-Thread(target=periodic_save_tasks, daemon=True).start()
+# Results of previously analyzed audio, keyed on content hash, model, prompt and pipeline settings
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(500 * 1024 * 1024)))
+result_cache = ResultCache("cache", max_bytes=RESULT_CACHE_MAX_BYTES)
 
-# Ensure tasks are saved on shutdown
-atexit.register(save_tasks)
+def result_cache_key(content_hash):
+    # Precision, VAD and the summary budgets change the output too, so they are in the key
+    return ResultCache.make_key(content_hash, WHISPER_MODEL, FILLER_PROMPT, output_settings())
 
-# Utility function to process the audio in a thread
-def process_audio(file_path: str, task_id: str):
-    """Process the audio file in a background thread."""
+# Stage transitions and analyzed segments of running tasks, streamed by /progress
+progress_broker = ProgressBroker()
+
+# Metrics served by /metrics; pipeline stage and model call spans are recorded in ai_scripts
+TASKS_TOTAL = REGISTRY.register(Counter(
+    "analysis_tasks_total", "Tasks by outcome: queued, cached, completed, failed or rejected", ["status"]))
+REGISTRY.register(Gauge(
+    "analysis_tasks", "Tasks currently stored, by status", ["status"],
+    callback=lambda: {(status,): count for status, count in tasks.count_by_status().items()}))
+REGISTRY.register(Gauge(
+    "scheduler_jobs", "Jobs waiting in or running on the scheduler", ["state"],
+    callback=lambda: {(state,): scheduler.stats()[state] for state in ("queued", "running")}))
+REGISTRY.register(Gauge(
+    "models_loaded", "Models loaded in the server process", callback=lambda: len(model_stats()["models"])))
+REGISTRY.register(Gauge(
+    "process_resident_memory_megabytes", "Resident set size of the server process", callback=lambda: model_stats()["process_rss_mb"]))
+AUDIO_DURATION_SECONDS = REGISTRY.register(Histogram(
+    "audio_duration_seconds", "Duration of analyzed recordings", buckets=(15, 30, 60, 120, 300, 600, 1200, 1800, 3600)))
+TASK_PROCESSING_SECONDS = REGISTRY.register(Histogram(
+    "task_processing_seconds", "Wall time to analyze one recording"))
+TASK_REALTIME_FACTOR = REGISTRY.register(Histogram(
+    "task_processing_realtime_factor", "Processing time divided by audio duration",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4)))
+
+def queue_task(file_path: str, task_id: str, content_hash: str = None):
+    """Put a task on the worker pool and announce its queue position; raises QueueFull."""
+    progress_broker.open(task_id)
+    # Announced before submitting so a worker's "processing" event can't overtake it
+    progress_broker.publish(task_id, {"stage": "queued", "queue_position": scheduler.stats()["queued"] + 1})
     try:
-        print(f"Starting preprocess_audio_pipeline for task {task_id}")
-        output_dir = preprocess_audio_pipeline(
+        scheduler.submit(task_id, process_audio, file_path, task_id, content_hash)
+    except QueueFull as e:
+        TASKS_TOTAL.inc(status="rejected")
+        progress_broker.publish(task_id, {"stage": "failed", "error": str(e)})
+        raise
+    TASKS_TOTAL.inc(status="queued")
+
+# Failures worth another attempt with a shared queue: the job itself is probably fine
+TRANSIENT_ERRORS = (WorkerCrashed, sqlite3.OperationalError, ConnectionError, TimeoutError)
+
+# Utility function to process the audio on a scheduler worker
+@register_job_handler
+def process_audio(file_path: str, task_id: str, content_hash: str = None):
+    """Process the audio file on a worker thread."""
+    # Shared queues deliver at least once: skip a job whose task is already done or deleted
+    task = tasks.get(task_id)
+    if task is None or task["status"] == "completed":
+        logger.info("Skipping task %s: %s", task_id, "deleted" if task is None else "already completed")
+        progress_broker.close(task_id)
+        return
+    tasks.update(task_id, status="processing")
+    progress_broker.publish(task_id, {"stage": "processing"})
+    started_at = time.perf_counter()
+    try:
+        logger.info("Starting preprocess_audio_pipeline for task %s", task_id)
+        output_dir, result_data = execution_backend.run(
             input_file=file_path,
             base_output_dir="transcriptions",
-            model_name="base",
-            prompt="uh, um, ah, like, you know, well, hmm, uh-huh, okay..."
+            model_name=WHISPER_MODEL,
+            prompt=FILLER_PROMPT,
+            progress=lambda event: progress_broker.publish(task_id, event)
         )
-        print(f"Finished preprocess_audio_pipeline for task {task_id}, output_dir: {output_dir}")
+        elapsed = time.perf_counter() - started_at
+        logger.info("Finished preprocess_audio_pipeline for task %s in %.2f sec, output_dir: %s", task_id, elapsed, output_dir)
+        TASK_PROCESSING_SECONDS.observe(elapsed)
+        duration = result_data.get("duration")
+        if duration:
+            AUDIO_DURATION_SECONDS.observe(duration)
+            TASK_REALTIME_FACTOR.observe(elapsed / duration)
+
+        # Save results to tasks; a no-op if another delivery of this job got there first
+        tasks.finish(task_id, "completed", results=result_data, duration=result_data.get("duration", "Unknown"))
+        progress_broker.publish(task_id, {"stage": "completed"})
+        TASKS_TOTAL.inc(status="completed")
+        logger.info("Task %s completed successfully", task_id)
 
-        # Save results to tasks
-        with open(f"{output_dir}/analysis_results.json", "r", encoding="utf-8") as result_file:
-            result_data = json.load(result_file)
-            tasks[task_id]["status"] = "completed"
-            tasks[task_id]["results"] = result_data
-            tasks[task_id]["duration"] = result_data.get("duration", "Unknown")
-        print(f"Task {task_id} completed successfully")
+        # Best effort: a cache write failure must not fail a finished analysis
+        if content_hash:
+            try:
+                result_cache.put(result_cache_key(content_hash), result_data)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning("Could not cache results of task %s: %s", task_id, e)
 
+    except TRANSIENT_ERRORS as e:
+        if not scheduler.retries:
+            fail_task(task_id, e)
+            return
+        # Hand the job back to the shared queue to run again, here or on another worker
+        logger.warning("Transient error in task %s, will retry: %s", task_id, e)
+        tasks.update(task_id, status="queued")
+        progress_broker.publish(task_id, {"stage": "queued", "queue_position": None})
+        raise
     except Exception as e:
-        print(f"Error in processing task {task_id}: {str(e)}")
-        tasks[task_id]["status"] = "failed"
-        tasks[task_id]["error"] = str(e)
+        fail_task(task_id, e)
+
+def fail_task(task_id: str, error):
+    logger.error("Error in processing task %s: %s", task_id, error, exc_info=isinstance(error, BaseException))
+    if tasks.finish(task_id, "failed", error=str(error)):
+        TASKS_TOTAL.inc(status="failed")
+    progress_broker.publish(task_id, {"stage": "failed", "error": str(error)})
+
+@register_dead_letter_handler(process_audio)
+def fail_abandoned_task(job_id: str, args, error: str):
+    """A shared-queue job that kept failing or timing out: fail its task so clients stop waiting."""
+    fail_task(args[1], f"Analysis failed after repeated attempts: {error}")
+
+# Upload limits. Starlette spools the whole multipart body to a temporary file before
+# the handler runs, so the size is checked up front from Content-Length (plus room for
+# the multipart framing) and again, for chunked uploads without one, while copying.
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+MAX_AUDIO_SECONDS = float(os.environ.get("MAX_AUDIO_SECONDS", "3600"))
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Compressed playback copies are encoded by a few ffmpeg processes at a time, so a burst
+# of uploads queues up here instead of starting one encoder per file
+RENDITION_WORKERS = int(os.environ.get("RENDITION_WORKERS", "1"))
+rendition_executor = ThreadPoolExecutor(max_workers=RENDITION_WORKERS, thread_name_prefix="rendition")
+
+def encode_task_rendition(task_id: str, file_path: str):
+    """Encode a task's playback rendition, unless the task was deleted while this waited."""
+    if task_id not in tasks:
+        return
+    rendition_path = encode_rendition(normalized_path_for(file_path), rendition_path_for(file_path))
+    # Deleted while encoding: its files were removed before the rendition existed
+    if rendition_path is not None and task_id not in tasks:
+        try:
+            os.remove(rendition_path)
+        except FileNotFoundError:
+            pass
+
+def remove_upload_files(file_path: str):
+    for path in (file_path, normalized_path_for(file_path), rendition_path_for(file_path)):
+        if os.path.exists(path):
+            os.remove(path)
+
+def finish_from_cache(task_id: str, content_hash: str):
+    """Complete a task with cached results of the same audio; False on a cache miss."""
+    # Reading and decompressing the entry and writing the results both block
+    cached_results = result_cache.get(result_cache_key(content_hash))
+    if cached_results is None:
+        return False
+    logger.info("Task %s served from result cache", task_id)
+    TASKS_TOTAL.inc(status="cached")
+    tasks.finish(task_id, "completed", results=cached_results, duration=cached_results.get("duration", "Unknown"))
+    return True
 
 @app.post("/upload")
 async def upload_audio(file: UploadFile = File(...)):
     """Upload an audio file and start processing."""
     task_id = str(uuid4())
-    tasks[task_id] = {
-        "task_id": task_id,
-        "file_name": file.filename,
-        "status": "processing",
-        "uploaded_at": datetime.now().isoformat(),
-        "duration": None,
-        "results": None
-    }
     # Save the file to disk
     file_path = f"uploads/{task_id}_{file.filename}"
-    print(f"Saving file to {file_path}")
+    logger.info("Saving file to %s", file_path)
     os.makedirs("uploads", exist_ok=True)
-    with open(file_path, "wb") as file_object:
-        shutil.copyfileobj(file.file, file_object)
+    # Copy from Starlette's spooled body, hash and decode to normalized 16 kHz PCM, off the event loop
+    try:
+        ingested = await run_in_threadpool(ingest_upload, file.file, file_path, MAX_UPLOAD_BYTES, MAX_AUDIO_SECONDS)
+    except IngestError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    content_hash = ingested["content_hash"]
 
-    # Offload processing to a thread
-    Thread(target=process_audio, args=(file_path, task_id)).start()
+    # Store and queue calls can wait on SQLite locks (busy timeout 30 s), so they run off the event loop
+    await run_in_threadpool(tasks.create, {
+        "task_id": task_id,
+        "file_name": file.filename,
+        "status": "queued",
+        "uploaded_at": datetime.now().isoformat(),
+        "duration": ingested["duration"],
+        "content_hash": content_hash
+    })
+
+    # Same audio analyzed before with the same settings: complete straight from the cache
+    if await run_in_threadpool(finish_from_cache, task_id, content_hash):
+        rendition_executor.submit(encode_task_rendition, task_id, file_path)
+        return {"task_id": task_id, "status": "completed"}
+
+    # Queue processing on the worker pool
+    try:
+        await run_in_threadpool(queue_task, ingested["normalized_path"], task_id, content_hash)
+    except QueueFull:
+        await run_in_threadpool(delete_task, task_id)
+        raise HTTPException(status_code=429, detail="Too many analyses in progress, try again later")
 
-    return {"task_id": task_id, "status": "processing"}
+    # Compressed copy for playback, encoded once in the background now that the task is accepted
+    rendition_executor.submit(encode_task_rendition, task_id, file_path)
+    queue_position = await run_in_threadpool(scheduler.queue_position, task_id)
+    return {"task_id": task_id, "status": "queued", "queue_position": queue_position}
 
 @app.get("/all-analyses")
-async def all_analyses():
-    """List all analysis tasks."""
+async def all_analyses(request: Request, status: str = None, order: str = "asc", limit: int = 100, cursor: str = None):
+    """List analysis tasks one page at a time, sorted by upload time and optionally filtered by status."""
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="order must be 'asc' or 'desc'")
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    try:
+        page, next_cursor, total = await run_in_threadpool(tasks.list_tasks, status=status, order=order, limit=limit, cursor=cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     file_list = [
         {
-            "task_id": task_id,
+            "task_id": task["task_id"],
             "file_name": task["file_name"],
             "duration": task.get("duration", "Unknown"),
             "uploaded_at": task["uploaded_at"],
             "status": task["status"]
         }
-        for task_id, task in tasks.items()
+        for task in page
     ]
-    return {"tasks": file_list}
+    body = {"tasks": file_list, "next_cursor": next_cursor, "total": total}
 
-# Endpoint: Delete File
-@app.delete("/delete-file/{task_id}")
-async def delete_file(task_id: str):
-    """Delete a file and its associated results."""
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail="Task ID not found")
+    # Pollers get a 304 while their page is unchanged
+    payload = json.dumps(body, sort_keys=True)
+    etag = '"' + hashlib.md5(payload.encode("utf-8")).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=payload, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
 
-    # Remove task
-    task = tasks.pop(task_id)
+def delete_task(task_id: str):
+    """Remove a task, its uploaded files and its results directory; None if it did not exist."""
+    task = tasks.delete(task_id)
+    progress_broker.close(task_id)
+    if task is None:
+        return None
 
-    # Delete associated file
-    file_path = f"uploads/{task_id}_{task['file_name']}"
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    # Delete associated files
+    remove_upload_files(f"uploads/{task_id}_{task['file_name']}")
 
     # Delete analysis results directory
     output_dir = f"transcriptions/{task_id}"
     if os.path.exists(output_dir):
         shutil.rmtree(output_dir)
+    return task
+
+# Endpoint: Delete File
+@app.delete("/delete-file/{task_id}")
+async def delete_file(task_id: str):
+    """Delete a file and its associated results."""
+    if await run_in_threadpool(delete_task, task_id) is None:
+        raise HTTPException(status_code=404, detail="Task ID not found")
 
     return {"status": "success", "message": f"Task {task_id} deleted successfully"}
   
 @app.get("/fetch-analysis/{task_id}")
-async def fetch_analysis(task_id: str):
-    """Fetch analysis results for a specific task."""
-    if task_id not in tasks:
-        raise HTTPException(status_code=404, detail="Task ID not found")
+async def fetch_analysis(task_id: str, fields: str = None):
+    """
+    Fetch analysis results for a specific task.
+    fields selects the result sections to send (summary, segments, word_metrics,
+    loudness_envelope, comma-separated); everything by default.
+    """
+    try:
+        fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(analysis_response, task_id, fields)
 
-    task = tasks[task_id]
+def analysis_response(task_id: str, fields):
+    task = tasks.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task ID not found")
 
     # Return the appropriate response based on the task status
     if task["status"] == "completed":
@@ -161,7 +443,7 @@ async def fetch_analysis(task_id: str):
             "file_name": task["file_name"],
             "duration": task.get("duration", "Unknown"),
             "uploaded_at": task["uploaded_at"],
-            "results": task["results"]
+            "results": tasks.get_results(task_id, fields)
         }
     elif task["status"] == "failed":
         return {
@@ -170,27 +452,213 @@ async def fetch_analysis(task_id: str):
             "uploaded_at": task["uploaded_at"],
             "error": task["error"]
         }
-    else:  # Status is "processing"
+    else:  # Status is "queued" or "processing"
         return {
-            "status": "processing",
+            "status": task["status"],
             "file_name": task["file_name"],
-            "uploaded_at": task["uploaded_at"]
+            "uploaded_at": task["uploaded_at"],
+            "queue_position": scheduler.queue_position(task_id)
         }
         
-@app.get("/fetch-audio/{task_id}")
-async def fetch_audio(task_id: str):
-    """Fetch the audio file for a specific task."""
-    if task_id not in tasks:
+def file_range_response(request: Request, file_path: str, media_type: str):
+    """Serve a file honouring a single-range Range header, so players can seek without downloading it all."""
+    size = os.path.getsize(file_path)
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except InvalidRange as e:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"}, content=str(e))
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file_range(file_path, 0, size - 1), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(iter_file_range(file_path, start, end), status_code=206, media_type=media_type, headers=headers)
+
+def task_upload_path(task_id: str):
+    task = tasks.get(task_id)
+    if task is None:
         raise HTTPException(status_code=404, detail="Task ID not found")
+    return f"uploads/{task_id}_{task['file_name']}"
 
-    task = tasks[task_id]
-    file_path = f"uploads/{task_id}_{task['file_name']}"
+@app.get("/fetch-audio/{task_id}")
+async def fetch_audio(task_id: str, request: Request, rendition: str = "auto"):
+    """
+    Fetch the audio file for a specific task, with Range support for seeking.
+    rendition: "compressed" (Opus), "original" (the upload as sent), or "auto" for the
+    compressed copy when it has been encoded and the original otherwise.
+    """
+    if rendition not in ("auto", "compressed", "original"):
+        raise HTTPException(status_code=400, detail="rendition must be 'auto', 'compressed' or 'original'")
+    file_path = await run_in_threadpool(task_upload_path, task_id)
+
+    compressed_path = rendition_path_for(file_path)
+    if rendition != "original" and os.path.exists(compressed_path):
+        return file_range_response(request, compressed_path, RENDITION_MEDIA_TYPE)
+    if rendition == "compressed":
+        raise HTTPException(status_code=404, detail="Compressed audio not available")
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
+    return file_range_response(request, file_path, media_type_for(file_path))
+
+def clip_response(file_path: str, start: float, end: float):
+    pcm_path = normalized_path_for(file_path)
+    if not os.path.exists(pcm_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        clip = cut_clip(pcm_path, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=clip, media_type="audio/wav")
+
+@app.get("/fetch-audio/{task_id}/clip")
+async def fetch_audio_clip(task_id: str, start: float, end: float):
+    """A WAV clip between start and end seconds, cut from the normalized audio."""
+    file_path = await run_in_threadpool(task_upload_path, task_id)
+    return await run_in_threadpool(clip_response, file_path, start, end)
+
+@app.get("/fetch-audio/{task_id}/segment/{segment_id}")
+async def fetch_segment_audio(task_id: str, segment_id: int):
+    """The audio of one transcribed segment, as a WAV clip."""
+    file_path = await run_in_threadpool(task_upload_path, task_id)
+    results = await run_in_threadpool(tasks.get_results, task_id, ("segments",))
+    segment = next((s for s in (results or {}).get("segments", []) if s.get("id") == segment_id), None)
+    if segment is None:
+        raise HTTPException(status_code=404, detail="Segment not found")
+    return await run_in_threadpool(clip_response, file_path, segment["start"], segment["end"])
+
+def format_sse(event):
+    return f"event: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.get("/progress/{task_id}")
+async def progress_stream(task_id: str, request: Request):
+    """Stream a task's stage transitions and analyzed segments as server-sent events."""
+    if not await run_in_threadpool(tasks.__contains__, task_id):
+        raise HTTPException(status_code=404, detail="Task ID not found")
+
+    async def events():
+        # Subscribe before reading the status so a completion in between isn't missed
+        subscriber, history = progress_broker.subscribe(task_id)
+        try:
+            task = await run_in_threadpool(tasks.get, task_id)
+            if task is None or task["status"] in FINAL_STAGES:
+                # Finished or deleted without a final event here (another process ran it)
+                progress_broker.close(task_id)
+                status = task["status"] if task else "failed"
+                yield format_sse({"stage": status, "task_id": task_id, "error": task.get("error") if task else "Task deleted"})
+                return
+            for event in history:
+                yield format_sse(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscriber[1].get(), timeout=15)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    # Tasks run by another process publish no events here; poll for the outcome
+                    task = await run_in_threadpool(tasks.get, task_id)
+                    if task is None or task["status"] in FINAL_STAGES:
+                        progress_broker.close(task_id)
+                        status = task["status"] if task else "failed"
+                        yield format_sse({"stage": status, "task_id": task_id, "error": task.get("error") if task else "Task deleted"})
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["stage"] in FINAL_STAGES:
+                    return
+        finally:
+            progress_broker.unsubscribe(task_id, subscriber)
 
-    return FileResponse(file_path, media_type="audio/wav")
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/queue-stats")
+async def get_queue_stats():
+    """Worker pool size and queue depth."""
+    return await run_in_threadpool(scheduler.stats)
+
+@app.get("/pipeline-stats")
+async def get_pipeline_stats():
+    """Per-stage queue depth, utilization, latency and throughput (staged backend only)."""
+    if not hasattr(execution_backend, "stats"):
+        return {"backend": execution_backend.name}
+    return {"backend": execution_backend.name, **execution_backend.stats()}
+
+@app.get("/cache-stats")
+async def get_cache_stats():
+    """Size and entry count of the result cache."""
+    return result_cache.stats()
+
+@app.get("/model-stats")
+async def get_model_stats():
+    """Load time and memory usage of the models loaded in this process."""
+    return model_stats()
+
+@app.get("/ready")
+async def readiness():
+    """Whether the inference backend is ready (200) or still starting / failed (503), with import timings."""
+    body = {
+        **inference_state,
+        "execution_backend": execution_backend.name,
+        "job_queue": JOB_QUEUE,
+        "server_role": SERVER_ROLE,
+        "server_import_sec": SERVER_IMPORT_SEC,
+    }
+    return Response(content=json.dumps(body), media_type="application/json",
+                    status_code=200 if inference_state["status"] == "ready" else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Task, queue, model and pipeline span metrics in the Prometheus text format."""
+    # Rendering reads task counts and queue depth from the store and queue
+    return Response(content=await run_in_threadpool(REGISTRY.render), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Re-queue tasks that were waiting or running when the server last stopped. Only for
+# the local queue: a shared queue keeps its jobs, and expired leases hand them out again.
+def resume_interrupted_tasks():
+    for task_id, task in tasks.items():
+        if task["status"] not in ("queued", "processing"):
+            continue
+        file_path = normalized_path_for(f"uploads/{task_id}_{task['file_name']}")
+        if not os.path.exists(file_path):
+            tasks.update(task_id, status="failed", error="Uploaded file missing after restart")
+            continue
+        tasks.update(task_id, status="queued")
+        try:
+            queue_task(file_path, task_id, task.get("content_hash"))
+        except QueueFull:
+            tasks.update(task_id, status="failed", error="Job queue full after restart")
+
+@app.on_event("shutdown")
+def drain_jobs():
+    """Stop taking uploads and let running analyses finish before closing the task store."""
+    # A shared queue keeps the jobs this process hasn't claimed, so nothing is cancelled
+    cancelled = scheduler.shutdown(cancel_pending=True)
+    if cancelled:
+        logger.warning("Shutting down with %d queued tasks; they will resume on next start", len(cancelled))
+    execution_backend.shutdown()
+    # Renditions not yet encoded are skipped; /fetch-audio falls back to the original
+    rendition_executor.shutdown(wait=True, cancel_futures=True)
+    tasks.close()
+
+# Startup work lives in the startup hook rather than at import time: process-backend
+# workers re-import this module when spawned and must not touch the task store
+@app.on_event("startup")
+def start_server():
+    # The task store and HTTP layer come up right away; the ML stack loads in the background
+    load_tasks()
+    logger.info("Server module imported in %.2f sec", SERVER_IMPORT_SEC)
+    if JOB_QUEUE == "local":
+        resume_interrupted_tasks()
+    if SERVER_ROLE == "api":
+        # Inference runs in separate worker processes
+        inference_state.update(status="ready", ready_at=datetime.now().isoformat())
+    else:
+        Thread(target=warm_up_models, name="warm-up", daemon=True).start()
+    scheduler.start()
 
-load_tasks()
+SERVER_IMPORT_SEC = time.perf_counter() - _import_started
 
 # Start FastAPI Server with Uvicorn
 if __name__ == "__main__":
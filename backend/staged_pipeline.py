@@ -0,0 +1,116 @@
+import time
+from collections import deque
+from concurrent.futures import Future
+from queue import Queue
+from threading import Thread, Lock
+
+# Window over which throughput (jobs/minute) is reported
+THROUGHPUT_WINDOW_SEC = 600
+
+
+class StagedPipeline:
+    """
+    Runs jobs through a fixed sequence of stages, each with its own queue and workers,
+    so different jobs can be in different stages at the same time.
+    """
+
+    def __init__(self, stages, concurrency=None):
+        """
+        Args:
+            stages: [(name, fn)] in order; each fn takes the job and returns it for the next stage.
+            concurrency (dict): Workers per stage name (default 1).
+        """
+        concurrency = concurrency or {}
+        self._stages = list(stages)
+        self._queues = [Queue() for _ in self._stages]
+        self._lock = Lock()
+        self._stats = [
+            {"name": name, "workers": concurrency.get(name, 1), "busy": 0, "completed": 0,
+             "failed": 0, "service_sec": 0.0, "wait_sec": 0.0}
+            for name, _ in self._stages
+        ]
+        self._completions = deque()
+        self._started_at = time.time()
+        self._workers = []
+        for index, stage_stats in enumerate(self._stats):
+            for i in range(stage_stats["workers"]):
+                worker = Thread(target=self._worker_loop, args=(index,), name=f"{stage_stats['name']}-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, job):
+        """Queue a job at the first stage; returns a Future resolved with the job after the last stage."""
+        future = Future()
+        self._queues[0].put((job, future, time.perf_counter()))
+        return future
+
+    def _worker_loop(self, index):
+        _, stage = self._stages[index]
+        stage_stats = self._stats[index]
+        while True:
+            item = self._queues[index].get()
+            if item is None:
+                return
+            job, future, enqueued_at = item
+            started_at = time.perf_counter()
+            with self._lock:
+                stage_stats["busy"] += 1
+                stage_stats["wait_sec"] += started_at - enqueued_at
+            try:
+                job = stage(job)
+                failed = None
+            except Exception as e:
+                failed = e
+            finished_at = time.perf_counter()
+            with self._lock:
+                stage_stats["busy"] -= 1
+                stage_stats["service_sec"] += finished_at - started_at
+                stage_stats["failed" if failed else "completed"] += 1
+                if not failed and index == len(self._stages) - 1:
+                    self._completions.append(time.time())
+
+            if failed:
+                future.set_exception(failed)
+            elif index == len(self._stages) - 1:
+                future.set_result(job)
+            else:
+                self._queues[index + 1].put((job, future, finished_at))
+
+    def stats(self):
+        """Per-stage queue depth, utilization and latency, plus recent end-to-end throughput."""
+        now = time.time()
+        with self._lock:
+            while self._completions and self._completions[0] < now - THROUGHPUT_WINDOW_SEC:
+                self._completions.popleft()
+            window = min(THROUGHPUT_WINDOW_SEC, now - self._started_at) or 1
+            uptime = now - self._started_at or 1
+            stages = []
+            for queue, stage_stats in zip(self._queues, self._stats):
+                processed = stage_stats["completed"] + stage_stats["failed"]
+                stages.append({
+                    "name": stage_stats["name"],
+                    "workers": stage_stats["workers"],
+                    "queued": queue.qsize(),
+                    "busy": stage_stats["busy"],
+                    "completed": stage_stats["completed"],
+                    "failed": stage_stats["failed"],
+                    "avg_service_sec": stage_stats["service_sec"] / processed if processed else None,
+                    "avg_wait_sec": stage_stats["wait_sec"] / processed if processed else None,
+                    # Fraction of the stage's worker time spent running jobs since start
+                    "utilization": stage_stats["service_sec"] / (uptime * stage_stats["workers"]),
+                })
+            return {
+                "stages": stages,
+                "throughput_jobs_per_min": len(self._completions) * 60 / window,
+                "completed": self._stats[-1]["completed"] if self._stats else 0,
+            }
+
+    def shutdown(self):
+        """Let queued jobs flow through every stage, then stop the workers."""
+        for queue, stage_stats in zip(self._queues, self._stats):
+            for _ in range(stage_stats["workers"]):
+                queue.put(None)
+            # Wait for this stage's workers before stopping the next, so no job is stranded
+            for worker in self._workers:
+                if worker.name.startswith(f"{stage_stats['name']}-"):
+                    worker.join()
@@ -0,0 +1,350 @@
+import os
+import json
+import base64
+import sqlite3
+import logging
+from bisect import bisect_left, bisect_right, insort
+from threading import Lock
+from contextlib import contextmanager
+
+from results_format import SECTIONS, pack_results, unpack_results, select_fields
+
+logger = logging.getLogger(__name__)
+
+# SQLite-backed task store. Task metadata (small) is mirrored in memory and written
+# through one row at a time; analysis results live in their own table, one compressed
+# row per section (see results_format), and only the sections a client asks for are read.
+# SharedTaskStore keeps no mirror, for several processes sharing one database file on
+# the same host (WAL mode needs shared memory, so not over a network filesystem).
+
+
+class InvalidCursor(ValueError):
+    """Raised for a listing cursor that was not produced by TaskStore.list_tasks."""
+
+
+def encode_cursor(uploaded_at, task_id):
+    return base64.urlsafe_b64encode(f"{uploaded_at}|{task_id}".encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        uploaded_at, task_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+    except (ValueError, UnicodeError):
+        raise InvalidCursor(f"Invalid cursor '{cursor}'")
+    return uploaded_at, task_id
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    uploaded_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status_uploaded_at ON tasks (status, uploaded_at);
+CREATE INDEX IF NOT EXISTS tasks_uploaded_at ON tasks (uploaded_at, task_id);
+CREATE TABLE IF NOT EXISTS results (
+    task_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS result_sections (
+    task_id TEXT NOT NULL,
+    section TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (task_id, section)
+);
+"""
+
+
+class TaskStore:
+    def __init__(self, db_path="tasks.db"):
+        self.db_path = db_path
+        self._tasks = {}
+        # Listing index: (uploaded_at, task_id) keys kept sorted, for all tasks (None) and per status
+        self._index = {None: []}
+        self._lock = Lock()
+        self._conn = None
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def open(self, legacy_json_file=None):
+        """Connect, create the schema and load task metadata (never results)."""
+        self._connect()
+        with self._lock:
+            self._tasks = {
+                task_id: json.loads(data)
+                for task_id, data in self._conn.execute("SELECT task_id, data FROM tasks")
+            }
+            self._index = {None: []}
+            for task in self._tasks.values():
+                self._index_add(task)
+        if legacy_json_file and os.path.exists(legacy_json_file):
+            self._migrate_json(legacy_json_file)
+
+    def _migrate_json(self, legacy_json_file):
+        """Import a tasks.json written by older versions, then move it out of the way."""
+        logger.info("Migrating %s into %s", legacy_json_file, self.db_path)
+        with open(legacy_json_file, "r", encoding="utf-8") as f:
+            legacy_tasks = json.load(f)
+        for task_id, task in legacy_tasks.items():
+            results = task.pop("results", None)
+            if task_id not in self:
+                self.create(task)
+            if results is not None:
+                self.set_results(task_id, results)
+        os.replace(legacy_json_file, f"{legacy_json_file}.migrated")
+
+    def _index_add(self, task):
+        key = (task["uploaded_at"], task["task_id"])
+        insort(self._index[None], key)
+        insort(self._index.setdefault(task["status"], []), key)
+
+    def _index_remove(self, task):
+        key = (task["uploaded_at"], task["task_id"])
+        for index_key in (None, task["status"]):
+            keys = self._index.get(index_key, [])
+            position = bisect_left(keys, key)
+            if position < len(keys) and keys[position] == key:
+                del keys[position]
+
+    def _write(self, task):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO tasks (task_id, status, uploaded_at, data) VALUES (?, ?, ?, ?)",
+            (task["task_id"], task["status"], task["uploaded_at"], json.dumps(task, ensure_ascii=False)),
+        )
+
+    def create(self, task):
+        task = dict(task)
+        task.pop("results", None)
+        with self._lock:
+            previous = self._tasks.get(task["task_id"])
+            if previous is not None:
+                self._index_remove(previous)
+            self._tasks[task["task_id"]] = task
+            self._index_add(task)
+            self._write(task)
+            self._conn.commit()
+
+    def update(self, task_id, **fields):
+        """Change some metadata fields of one task and persist just that row."""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None:
+                return  # Deleted while it was being processed
+            self._apply(task, fields)
+            self._conn.commit()
+
+    def _apply(self, task, fields):
+        reindex = any(k in fields and fields[k] != task.get(k) for k in ("status", "uploaded_at"))
+        if reindex:
+            self._index_remove(task)
+        task.update(fields)
+        if reindex:
+            self._index_add(task)
+        self._write(task)
+
+    def finish(self, task_id, status, results=None, **fields):
+        """
+        Record a task's outcome, with its results, in one transaction. A completed task is
+        never changed again, so a job delivered twice (or a superseded attempt failing
+        late) can't overwrite it. Returns False if the task was completed or deleted.
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is None or task["status"] == "completed":
+                return False
+            if results is not None:
+                self._write_results(task_id, results)
+            self._apply(task, dict(fields, status=status))
+            self._conn.commit()
+        return True
+
+    def get(self, task_id):
+        with self._lock:
+            task = self._tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def items(self):
+        with self._lock:
+            return [(task_id, dict(task)) for task_id, task in self._tasks.items()]
+
+    def count_by_status(self):
+        """{status: number of tasks}."""
+        with self._lock:
+            return {status: len(keys) for status, keys in self._index.items() if status is not None}
+
+    def list_tasks(self, status=None, order="asc", limit=50, cursor=None):
+        """
+        One page of tasks sorted by uploaded_at, optionally filtered by status.
+        Returns (tasks, next_cursor, total); next_cursor is None on the last page.
+        """
+        with self._lock:
+            keys = self._index.get(status, [])
+            total = len(keys)
+            if order == "asc":
+                start = bisect_right(keys, decode_cursor(cursor)) if cursor else 0
+                page_keys = keys[start:start + limit]
+                has_more = start + limit < total
+            else:
+                end = bisect_left(keys, decode_cursor(cursor)) if cursor else total
+                page_keys = keys[max(0, end - limit):end][::-1]
+                has_more = end - limit > 0
+            page = [dict(self._tasks[task_id]) for _, task_id in page_keys]
+        next_cursor = encode_cursor(*page_keys[-1]) if has_more and page_keys else None
+        return page, next_cursor, total
+
+    def delete(self, task_id):
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task is not None:
+                self._index_remove(task)
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM results WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM result_sections WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+        return task
+
+    def _write_results(self, task_id, results):
+        sections = pack_results(results)
+        self._conn.execute("DELETE FROM result_sections WHERE task_id = ?", (task_id,))
+        self._conn.executemany(
+            "INSERT INTO result_sections (task_id, section, data) VALUES (?, ?, ?)",
+            [(task_id, section, data) for section, data in sections.items()],
+        )
+        # Rows in the older full-JSON table are superseded
+        self._conn.execute("DELETE FROM results WHERE task_id = ?", (task_id,))
+
+    def set_results(self, task_id, results):
+        with self._lock:
+            self._write_results(task_id, results)
+            self._conn.commit()
+
+    def get_results(self, task_id, fields=SECTIONS):
+        """Load the requested sections of a task's results from disk on demand."""
+        placeholders = ",".join("?" for _ in fields)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT section, data FROM result_sections WHERE task_id = ? AND section IN ({placeholders})",
+                (task_id, *fields),
+            ).fetchall()
+            stored = bool(rows) or self._conn.execute(
+                "SELECT 1 FROM result_sections WHERE task_id = ? LIMIT 1", (task_id,)).fetchone() is not None
+            legacy = None
+            if not stored:
+                legacy = self._conn.execute("SELECT data FROM results WHERE task_id = ?", (task_id,)).fetchone()
+        if stored:
+            return unpack_results(dict(rows), fields)
+        # Results stored before the sectioned format
+        return select_fields(json.loads(legacy[0]), fields) if legacy else None
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class SharedTaskStore(TaskStore):
+    """
+    TaskStore for several processes (API replicas and inference workers) using one
+    database file. Nothing is mirrored in memory: reads go to SQLite, and updates read
+    and write the row inside one IMMEDIATE transaction so concurrent writers don't
+    lose each other's fields.
+    """
+
+    def open(self, legacy_json_file=None):
+        self._connect()
+        if legacy_json_file and os.path.exists(legacy_json_file):
+            self._migrate_json(legacy_json_file)
+
+    @contextmanager
+    def _immediate(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def _fetch(self, task_id):
+        row = self._conn.execute("SELECT data FROM tasks WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def create(self, task):
+        task = dict(task)
+        task.pop("results", None)
+        with self._immediate():
+            self._write(task)
+
+    def update(self, task_id, **fields):
+        with self._immediate():
+            task = self._fetch(task_id)
+            if task is None:
+                return  # Deleted while it was being processed
+            task.update(fields)
+            self._write(task)
+
+    def finish(self, task_id, status, results=None, **fields):
+        with self._immediate():
+            task = self._fetch(task_id)
+            if task is None or task["status"] == "completed":
+                return False
+            if results is not None:
+                self._write_results(task_id, results)
+            task.update(fields, status=status)
+            self._write(task)
+        return True
+
+    def get(self, task_id):
+        with self._lock:
+            return self._fetch(task_id)
+
+    def __contains__(self, task_id):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM tasks WHERE task_id = ?", (task_id,)).fetchone() is not None
+
+    def items(self):
+        with self._lock:
+            return [(task_id, json.loads(data)) for task_id, data in self._conn.execute("SELECT task_id, data FROM tasks")]
+
+    def count_by_status(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+
+    def list_tasks(self, status=None, order="asc", limit=50, cursor=None):
+        where, params = [], []
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        count_sql = "SELECT COUNT(*) FROM tasks" + (" WHERE " + " AND ".join(where) if where else "")
+        count_params = list(params)
+        if cursor:
+            where.append("(uploaded_at, task_id) " + (">" if order == "asc" else "<") + " (?, ?)")
+            params.extend(decode_cursor(cursor))
+        direction = "ASC" if order == "asc" else "DESC"
+        sql = ("SELECT uploaded_at, task_id, data FROM tasks" + (" WHERE " + " AND ".join(where) if where else "")
+               + f" ORDER BY uploaded_at {direction}, task_id {direction} LIMIT ?")
+        with self._lock:
+            total = self._conn.execute(count_sql, count_params).fetchone()[0]
+            rows = self._conn.execute(sql, (*params, limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][0], rows[-1][1]) if has_more else None
+        return [json.loads(data) for _, _, data in rows], next_cursor, total
+
+    def delete(self, task_id):
+        with self._immediate():
+            task = self._fetch(task_id)
+            self._conn.execute("DELETE FROM tasks WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM results WHERE task_id = ?", (task_id,))
+            self._conn.execute("DELETE FROM result_sections WHERE task_id = ?", (task_id,))
+        return task
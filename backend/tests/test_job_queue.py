@@ -0,0 +1,121 @@
+import pytest
+from threading import Event
+
+from job_queue import SQLiteJobQueue, RedisJobQueue, DistributedScheduler, register_job_handler, register_dead_letter_handler
+from scheduler import QueueFull
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path):
+    if request.param == "sqlite":
+        job_queue = SQLiteJobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")  # fakeredis runs the Lua scripts with lupa
+        job_queue = RedisJobQueue(fakeredis.FakeRedis(), max_attempts=2)
+    yield job_queue
+    job_queue.close()
+
+
+def test_claims_in_enqueue_order(queue):
+    queue.enqueue("a", {"n": 1})
+    queue.enqueue("b", {"n": 2})
+    assert queue.position("a") == 1
+    assert queue.position("b") == 2
+
+    lease = queue.claim("worker")
+    assert (lease.job_id, lease.payload, lease.attempts) == ("a", {"n": 1}, 1)
+    assert queue.position("a") == 0
+    assert queue.position("b") == 1
+    assert queue.stats() == {"queued": 1, "leased": 1, "dead": 0}
+
+
+def test_enqueue_past_max_queued_raises(queue):
+    queue.enqueue("a", {}, max_queued=1)
+    with pytest.raises(QueueFull):
+        queue.enqueue("b", {}, max_queued=1)
+    # Re-enqueueing a job already waiting doesn't count against the limit
+    queue.enqueue("a", {}, max_queued=1)
+
+
+def test_ack_needs_the_current_lease(queue):
+    queue.enqueue("a", {})
+    lease = queue.claim("worker")
+    assert queue.heartbeat("a", lease.token)
+    assert not queue.ack("a", "stale-token")
+    assert queue.ack("a", lease.token)
+    assert queue.position("a") is None
+    assert queue.claim("worker") is None
+
+
+def test_expired_lease_is_handed_out_again(queue):
+    queue.enqueue("a", {})
+    first = queue.claim("worker-1", lease_sec=-1)
+    second = queue.claim("worker-2")
+    assert second.job_id == "a"
+    assert second.attempts == 2
+    # The first worker lost the job and can neither renew nor acknowledge it
+    assert not queue.heartbeat("a", first.token)
+    assert not queue.ack("a", first.token)
+    assert queue.ack("a", second.token)
+
+
+def test_nack_retries_then_buries_the_job(queue):
+    queue.enqueue("a", {"n": 1})
+    lease = queue.claim("worker")
+    assert queue.nack("a", lease.token, "boom")
+    lease = queue.claim("worker")
+    assert lease.attempts == 2
+    assert queue.nack("a", lease.token, "boom again")
+
+    assert queue.claim("worker") is None
+    assert queue.position("a") is None
+    assert queue.stats()["dead"] == 1
+    assert queue.take_dead() == [("a", {"n": 1}, "boom again")]
+    assert queue.take_dead() == []
+
+
+def test_lease_expiring_on_the_last_attempt_buries_the_job(queue):
+    queue.enqueue("a", {})
+    lease = queue.claim("worker", lease_sec=-1)
+    assert queue.nack("a", lease.token)
+    queue.claim("worker", lease_sec=-1)
+    assert queue.claim("worker") is None
+    [dead] = queue.take_dead()
+    assert dead.job_id == "a"
+    assert dead.error == "Lease expired"
+
+
+def test_cancel_drops_only_waiting_jobs(queue):
+    queue.enqueue("a", {})
+    queue.enqueue("b", {})
+    queue.claim("worker")
+    assert not queue.cancel("a")
+    assert queue.cancel("b")
+    assert queue.position("b") is None
+
+
+def test_scheduler_retries_then_calls_the_dead_letter_handler(tmp_path):
+    calls, dead = [], []
+    gave_up = Event()
+
+    @register_job_handler
+    def flaky_job(job_id):
+        calls.append(job_id)
+        raise ConnectionError("lost the database")
+
+    @register_dead_letter_handler(flaky_job)
+    def give_up(job_id, args, error):
+        dead.append((job_id, args, error))
+        gave_up.set()
+
+    scheduler = DistributedScheduler(SQLiteJobQueue(str(tmp_path / "jobs.db"), max_attempts=2),
+                                     worker_count=1, poll_interval=0.01)
+    scheduler.submit("a", flaky_job, "a")
+    scheduler.start()
+    try:
+        assert gave_up.wait(5)
+    finally:
+        scheduler.shutdown()
+    assert calls == ["a", "a"]
+    assert dead == [("a", ["a"], "lost the database")]
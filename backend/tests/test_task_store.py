@@ -0,0 +1,77 @@
+import pytest
+
+from task_store import TaskStore, SharedTaskStore, InvalidCursor
+
+
+@pytest.fixture(params=[TaskStore, SharedTaskStore])
+def store(request, tmp_path):
+    tasks = request.param(str(tmp_path / "tasks.db"))
+    tasks.open()
+    yield tasks
+    tasks.close()
+
+
+def add_tasks(store, count):
+    for i in range(count):
+        # Pairs share an upload time, so the cursor has to break ties on task_id
+        store.create({"task_id": f"t{i}", "file_name": f"{i}.wav", "status": "completed" if i % 3 else "failed",
+                      "uploaded_at": f"2024-01-01T00:00:{i // 2:02d}"})
+
+
+def walk(store, **kwargs):
+    seen, cursor = [], None
+    while True:
+        page, cursor, total = store.list_tasks(limit=3, cursor=cursor, **kwargs)
+        seen.extend(task["task_id"] for task in page)
+        if cursor is None:
+            return seen, total
+
+
+def test_pages_cover_every_task_once_in_order(store):
+    add_tasks(store, 10)
+    ascending, total = walk(store)
+    assert total == 10
+    assert ascending == sorted(ascending, key=lambda t: (store.get(t)["uploaded_at"], t))
+    assert len(set(ascending)) == 10
+    descending, _ = walk(store, order="desc")
+    assert descending == ascending[::-1]
+
+
+def test_status_filter(store):
+    add_tasks(store, 10)
+    failed, total = walk(store, status="failed")
+    assert failed == ["t0", "t3", "t6", "t9"]
+    assert total == 4
+
+
+def test_stores_list_the_same_pages(tmp_path):
+    local, shared = TaskStore(str(tmp_path / "a.db")), SharedTaskStore(str(tmp_path / "b.db"))
+    for store in (local, shared):
+        store.open()
+        add_tasks(store, 7)
+    for kwargs in ({}, {"order": "desc"}, {"status": "completed"}):
+        assert walk(local, **kwargs) == walk(shared, **kwargs)
+
+
+def test_invalid_cursor(store):
+    with pytest.raises(InvalidCursor):
+        store.list_tasks(cursor="not a cursor")
+
+
+def test_completed_task_is_not_finished_again(store):
+    add_tasks(store, 1)
+    store.update("t0", status="processing")
+    assert store.finish("t0", "completed", results={"duration": 1.5, "segments": []})
+    assert not store.finish("t0", "failed", error="late retry")
+    assert store.get("t0")["status"] == "completed"
+    assert store.get_results("t0", ("summary",)) == {"duration": 1.5}
+
+
+def test_deleted_task_is_not_recreated(store):
+    add_tasks(store, 1)
+    assert store.delete("t0")["task_id"] == "t0"
+    store.update("t0", status="processing")
+    assert not store.finish("t0", "completed", results={})
+    assert store.get("t0") is None
+    assert "t0" not in store
+    assert store.delete("t0") is None
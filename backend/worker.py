@@ -0,0 +1,27 @@
+"""
+Inference worker without the HTTP API: claims analysis jobs from the shared queue and
+runs them, next to API replicas started with SERVER_ROLE=api. Run it from the backend
+directory on the API's host (it shares uploads/, tasks.db and cache/ with the API) as
+many times as needed:
+
+    JOB_QUEUE=sqlite python worker.py
+    JOB_QUEUE=redis REDIS_URL=redis://queue-host:6379/0 WORKER_COUNT=2 python worker.py
+"""
+import os
+import signal
+from threading import Event
+
+os.environ.setdefault("SERVER_ROLE", "worker")
+
+import server
+
+if __name__ == "__main__":
+    stop = Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    server.start_server()
+    server.logger.info("Worker consuming from the %s job queue", server.JOB_QUEUE)
+    while not stop.wait(1):
+        pass
+    # Running jobs finish and are acknowledged; unclaimed ones stay queued for other workers
+    server.drain_jobs()
@@ -40,6 +40,7 @@ const Chat: React.FC = () => {
   const [focusedPresentation, setFocusedPresentation] =
     useState<Presentation | null>(null);
   const [presentationList, setPresentationList] = useState<Presentation[]>([]);
+  const [totalPresentations, setTotalPresentations] = useState<number>(0);
   const [currentTaskId, setCurrentTaskId] = useState<string | null>(null);
 
   const presentationContains = (presentation: Presentation) => {
@@ -49,18 +50,30 @@ const Chat: React.FC = () => {
   };
 
   useEffect(() => {
-    const fetchData = () => {
-      fetch(`${apiUrl}/all-analyses`, {
-        method: "GET",
-      })
-        .then((response) => response.json())
-        .then((data) => {
-          // console.log("Fetched presentations:", data);
-          setPresentationList(data.tasks);
-        })
-        .catch((error) => {
-          console.error("Error fetching presentations:", error);
-        });
+    // The listing is paginated; walk every page, newest first, so recent
+    // uploads are always included
+    const fetchData = async () => {
+      try {
+        const tasks: Presentation[] = [];
+        let cursor: string | null = null;
+        let total = 0;
+        do {
+          const params = new URLSearchParams({ order: "desc", limit: "500" });
+          if (cursor) params.set("cursor", cursor);
+          const response = await fetch(`${apiUrl}/all-analyses?${params}`, {
+            method: "GET",
+          });
+          const data = await response.json();
+          tasks.push(...data.tasks);
+          total = data.total;
+          cursor = data.next_cursor;
+        } while (cursor);
+        // Shown oldest first, as before pagination
+        setPresentationList(tasks.reverse());
+        setTotalPresentations(total);
+      } catch (error) {
+        console.error("Error fetching presentations:", error);
+      }
     };
 
     // Call fetchData initially and set up an interval to refetch every second
@@ -200,7 +213,7 @@ const Chat: React.FC = () => {
                   practiced
                 </p>
                 <p className="text-black text-[70px] mb-4 font-medium text-right">
-                  {presentationList.length || "-"}
+                  {totalPresentations || "-"}
                 </p>
               </div>
 
@@ -344,11 +357,12 @@ const Chat: React.FC = () => {
       )}
 
       {currentTaskId &&
-        // loading if the current task is status processing
+        // loading if the current task is queued or processing
         presentationList.some(
           (presentation) =>
             presentation.task_id === currentTaskId &&
-            presentation.status === "processing"
+            (presentation.status === "queued" ||
+              presentation.status === "processing")
         ) && (
           <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/50 backdrop-blur-sm">
             <LoadingModal />
@@ -16,7 +16,7 @@ export const Feedback = (props: { presentation: Presentation }) => {
 
         // Fetch analysis
         const analysisResponse = await fetch(
-          `${apiUrl}/fetch-analysis/${presentation.task_id}`
+          `${apiUrl}/fetch-analysis/${presentation.task_id}?fields=summary`
         );
         if (!analysisResponse.ok) {
           throw new Error("Failed to fetch analysis");
@@ -25,18 +25,8 @@ export const Feedback = (props: { presentation: Presentation }) => {
         setAnalysis(analysisData);
         console.log("analysisData", analysisData);
 
-        // Fetch audio file
-        const audioResponse = await fetch(
-          `${apiUrl}/fetch-audio/${presentation.task_id}`
-        );
-        if (!audioResponse.ok) {
-          throw new Error("Failed to fetch audio file");
-        }
-
-        // Create a temporary URL for the audio file
-        const audioBlob = await audioResponse.blob();
-        const audioUrl = URL.createObjectURL(audioBlob);
-        setAudioFile(audioUrl);
+        // Stream the audio from the server; the player fetches byte ranges as it seeks
+        setAudioFile(`${apiUrl}/fetch-audio/${presentation.task_id}`);
       } catch (error) {
         console.error("Error fetching feedback:", error);
       } finally {
@@ -74,7 +64,12 @@ export const Feedback = (props: { presentation: Presentation }) => {
             <div className="w-full h-[50px] bg-[#D7DAC7] rounded-md mb-4 flex justify-center items-center">
               {audioFile && (
                 <audio controls>
-                  <source src={audioFile} type="audio/wav" />
+                  {/* Opus where the browser plays it; older Safari falls back to the upload as sent */}
+                  <source
+                    src={`${audioFile}?rendition=compressed`}
+                    type="audio/ogg; codecs=opus"
+                  />
+                  <source src={`${audioFile}?rendition=original`} />
                 </audio>
               )}
             </div>
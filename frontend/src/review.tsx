@@ -20,7 +20,7 @@ const Review = (props: { presentation: Presentation }) => {
     const fetchFeedback = async () => {
       try {
         const analysisResponse = await fetch(
-          `${apiUrl}/fetch-analysis/${presentation.task_id}`
+          `${apiUrl}/fetch-analysis/${presentation.task_id}?fields=summary,segments`
         );
         if (!analysisResponse.ok) {
           throw new Error("Failed to fetch analysis");